@@ -1,120 +1,324 @@
 import psycopg2
-from db import get_db_connection
+from psycopg2.extras import execute_batch, execute_values
+from db import get_conn, ensure_report_objects, ensure_token_columns, refresh_report_views
+from token_ids import MODEL_NAME, MAX_LENGTH, ONNX_MODEL_DIR, load_quantized_model, unpack_token_ids
 import logging
 import sys
-import subprocess
+from importlib.metadata import version
+import csv
+import io
+import hashlib
+from collections import Counter
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Check and install required dependencies
-def install_dependencies():
-    logger.info("Checking and installing required dependencies")
-    try:
-        # Install numpy<2 for compatibility
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "numpy<2", "--quiet"])
-        # Install transformers after numpy is configured
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "transformers", "--quiet"])
-        logger.info("Dependencies installed successfully")
-    except Exception as e:
-        logger.error(f"Error installing dependencies: {e}")
-        sys.exit(1)
-
-# Now import transformers after ensuring correct numpy version
-install_dependencies()
-from transformers import pipeline
+# Dependencies are pinned in requirements.txt; fail fast on an incompatible numpy
+# rather than hitting obscure errors inside torch/transformers
+if int(version("numpy").split(".")[0]) >= 2:
+    logger.error(f"numpy {version('numpy')} is installed but numpy<2 is required; run pip install -r requirements.txt")
+    sys.exit(1)
+
+import numpy as np
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
 
 # Load sentiment analysis model
+INFERENCE_BATCH_SIZE = 32
+# torch.compile and TorchScript specialize on input shapes, so those paths pad the
+# final partial batch instead of compiling or tracing a graph for a smaller one
+PAD_PARTIAL_BATCHES = False
+device = torch.device('cpu')
+# The compiled CUDA model and the eager CPU fallback's TorchScript graphs are both
+# specialized on sequence length. Those paths pad batches up to the next of these
+# lengths so short texts keep most of the savings from length bucketing while only
+# a handful of graphs are ever compiled or traced.
+USE_TRACING = False
+PAD_TO_TRACE_LENGTHS = False
+TRACE_LENGTHS = (32, 64, 128, 256)
+traced_models = {}
+
+def get_traced_model(input_ids, attention_mask):
+    length = input_ids.shape[1]
+    if length not in traced_models:
+        logger.info(f"Tracing sentiment model for sequence length {length}")
+        with torch.no_grad():
+            traced = torch.jit.trace(model, (input_ids, attention_mask))
+            traced_models[length] = torch.jit.optimize_for_inference(traced)
+    return traced_models[length]
+
+def pad_batch(sequences):
+    """Right-pad token id sequences into input_ids / attention_mask tensors"""
+    length = max(len(seq) for seq in sequences)
+    if PAD_TO_TRACE_LENGTHS:
+        length = next(n for n in TRACE_LENGTHS if n >= length)
+    input_ids = np.full((len(sequences), length), tokenizer.pad_token_id, dtype=np.int64)
+    attention_mask = np.zeros((len(sequences), length), dtype=np.int64)
+    for i, seq in enumerate(sequences):
+        input_ids[i, :len(seq)] = seq
+        attention_mask[i, :len(seq)] = 1
+    return torch.from_numpy(input_ids).to(device), torch.from_numpy(attention_mask).to(device)
+
+def predict(sequences):
+    """Classify token id sequences with one forward pass
+
+    Returns:
+        tuple: (labels, scores) lists aligned with sequences
+    """
+    input_ids, attention_mask = pad_batch(sequences)
+    if USE_TRACING:
+        traced = get_traced_model(input_ids, attention_mask)
+        with torch.inference_mode():
+            logits = traced(input_ids, attention_mask)[0]
+    else:
+        with torch.inference_mode():
+            logits = model(input_ids=input_ids, attention_mask=attention_mask).logits
+    probs = logits.float().softmax(-1).cpu().numpy()
+    best = probs.argmax(axis=1)
+    return LABELS[best].tolist(), probs[np.arange(len(best)), best].tolist()
+
 try:
-    sentiment_classifier = pipeline('sentiment-analysis', model='distilbert-base-uncased-finetuned-sst-2-english')
+    if torch.cuda.is_available():
+        device = torch.device('cuda')
+        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+        model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME, torch_dtype=torch.float16)
+        LABELS = np.array([model.config.id2label[i] for i in range(model.config.num_labels)])
+        model = torch.compile(model.to(device).eval(), mode="reduce-overhead")
+        PAD_PARTIAL_BATCHES = True
+        PAD_TO_TRACE_LENGTHS = True
+        logger.info("Compiling FP16 sentiment model on GPU (first call is slow)")
+        predict(tokenizer(["warm-up"] * INFERENCE_BATCH_SIZE)["input_ids"])
+        logger.info("Loaded FP16 sentiment model on GPU")
+    else:
+        try:
+            model = load_quantized_model()
+            tokenizer = AutoTokenizer.from_pretrained(ONNX_MODEL_DIR)
+            logger.info("Loaded INT8 ONNX Runtime sentiment model")
+        except ImportError:
+            logger.warning("optimum[onnxruntime] not installed, falling back to a TorchScript FP32 model")
+            # torchscript=True makes forward return plain tuples, which tracing requires
+            model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME, torchscript=True).eval()
+            tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+            USE_TRACING = True
+            PAD_TO_TRACE_LENGTHS = True
+            # Traced graphs are also fixed in the batch dimension
+            PAD_PARTIAL_BATCHES = True
+        LABELS = np.array([model.config.id2label[i] for i in range(model.config.num_labels)])
     logger.info("Sentiment analysis model loaded successfully")
 except Exception as e:
     logger.error(f"Error loading sentiment analysis model: {e}")
     sys.exit(1)
 
 def create_sentiment_table():
-    conn = get_db_connection()
-    if not conn:
-        logger.error("Database connection failed")
+    with get_conn() as conn:
+        if not conn:
+            logger.error("Database connection failed")
+            return
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sentiment_analysis (
+                id SERIAL PRIMARY KEY,
+                message_id VARCHAR(100),  -- Discord or Bluesky ID
+                platform VARCHAR(20),     -- 'discord' or 'bluesky'
+                sentiment VARCHAR(20),    -- 'POSITIVE' or 'NEGATIVE'
+                confidence FLOAT,
+                UNIQUE (message_id, platform)
+            );
+        """)
+        # Results keyed by content fingerprint so repeated texts skip the model
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sentiment_analysis_cache (
+                hash BYTEA PRIMARY KEY,   -- SHA1 of the normalized content
+                sentiment VARCHAR(20),
+                confidence FLOAT
+            );
+        """)
+        conn.commit()
+        cursor.close()
+    logger.info("Sentiment analysis table created or verified")
+
+def fingerprint(content):
+    """Hash normalized text so trivially different copies share one cache entry"""
+    return hashlib.sha1(' '.join(content.lower().split()).encode('utf-8')).digest()
+
+def lookup_sentiment_cache(cursor, batch):
+    """Fetch cached results for the texts in one batch of streamed rows
+
+    Looked up per batch rather than loaded whole, so memory stays flat however
+    many distinct texts the cache table has accumulated.
+    """
+    hashes = {fingerprint(content) for _, content, _, _ in batch if content and content.strip()}
+    if not hashes:
+        return {}
+    cursor.execute("SELECT hash, sentiment, confidence FROM sentiment_analysis_cache WHERE hash = ANY(%s)",
+                   ([psycopg2.Binary(h) for h in hashes],))
+    return {bytes(h): (sentiment, confidence) for h, sentiment, confidence in cursor.fetchall()}
+
+def classify_batch(batch, cache, inference_batch_size=INFERENCE_BATCH_SIZE):
+    """Run the classifier over a batch of (id, content, platform, token_ids) rows
+
+    Texts whose fingerprint is already in cache are not sent to the model, and rows
+    imported with stored token ids are not tokenized again. Returns the result rows
+    plus the (hash, sentiment, confidence) entries that were newly computed.
+    """
+    items = []
+    pending = {}
+    for item_id, content, platform, token_ids in batch:
+        if not content or not content.strip():
+            continue
+        h = fingerprint(content)
+        items.append((item_id, platform, h))
+        if h not in cache and h not in pending:
+            pending[h] = (content, token_ids)
+    if not items:
+        return [], []
+
+    hashes = list(pending)
+    sequences = [unpack_token_ids(token_ids) if token_ids is not None else None
+                 for _, token_ids in pending.values()]
+    # Rows are never streamed again once analyzed, so ids computed here are not
+    # written back; only rows that arrived without them (live collection, Bluesky) pay this
+    missing = [j for j, seq in enumerate(sequences) if seq is None]
+    if missing:
+        texts = [pending[hashes[j]][0] for j in missing]
+        for j, ids in zip(missing, tokenizer(texts, truncation=True, max_length=MAX_LENGTH)["input_ids"]):
+            sequences[j] = ids
+    new_entries = []
+    if sequences:
+        # Each forward pass pads to its longest sequence, so feeding the model runs of
+        # similarly sized texts keeps most of the compute off [PAD] tokens
+        order = np.argsort([len(seq) for seq in sequences], kind="stable")
+        for start in range(0, len(order), inference_batch_size):
+            chunk = order[start:start + inference_batch_size]
+            chunk_sequences = [sequences[j] for j in chunk]
+            if PAD_PARTIAL_BATCHES and len(chunk_sequences) < inference_batch_size:
+                # Outputs for the filler rows are dropped by the zip below
+                chunk_sequences += [chunk_sequences[-1]] * (inference_batch_size - len(chunk_sequences))
+            labels, scores = predict(chunk_sequences)
+            for j, label, score in zip(chunk, labels, scores):
+                cache[hashes[j]] = (label, score)
+                new_entries.append((psycopg2.Binary(hashes[j]), label, score))
+    return [(item_id, platform) + cache[h] for item_id, platform, h in items], new_entries
+
+def store_cache_entries(cursor, entries):
+    if entries:
+        execute_values(cursor, """
+            INSERT INTO sentiment_analysis_cache (hash, sentiment, confidence)
+            VALUES %s
+            ON CONFLICT (hash) DO NOTHING
+        """, entries, page_size=500)
+
+def store_results(cursor, rows, use_copy=False):
+    """Write one batch of (message_id, platform, sentiment, confidence) rows"""
+    if not rows:
+        return
+    if use_copy:
+        # COPY is the fastest ingest path but cannot skip conflicts, so it is only
+        # used while backfilling a table that started out empty
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        buf.seek(0)
+        cursor.copy_expert(
+            "COPY sentiment_analysis (message_id, platform, sentiment, confidence) FROM STDIN WITH CSV",
+            buf
+        )
+    else:
+        execute_batch(cursor, "EXECUTE ins_sa (%s, %s, %s, %s)", rows, page_size=500)
+
+def prepare_insert(cursor):
+    """Prepare the sentiment INSERT once per connection
+
+    Pooled connections keep their prepared statements, so this is a no-op when
+    the connection has already been through it.
+    """
+    cursor.execute("SELECT 1 FROM pg_prepared_statements WHERE name = 'ins_sa'")
+    if cursor.fetchone():
         return
-    cursor = conn.cursor()
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS sentiment_analysis (
-            id SERIAL PRIMARY KEY,
-            message_id VARCHAR(100),  -- Discord or Bluesky ID
-            platform VARCHAR(20),     -- 'discord' or 'bluesky'
-            sentiment VARCHAR(20),    -- 'POSITIVE' or 'NEGATIVE'
-            confidence FLOAT,
-            UNIQUE (message_id, platform)
-        );
+        PREPARE ins_sa (text, text, text, float8) AS
+        INSERT INTO sentiment_analysis (message_id, platform, sentiment, confidence)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (message_id, platform) DO NOTHING
     """)
-    conn.commit()
-    cursor.close()
-    conn.close()
-    logger.info("Sentiment analysis table created or verified")
 
-def analyze_and_store(batch_size=100):
-    conn = get_db_connection()
-    if not conn:
-        logger.error("Database connection failed")
-        return
-    cursor = conn.cursor()
-    try:
-        # Discord messages
-        cursor.execute("SELECT message_id, content FROM discord_messages WHERE content IS NOT NULL")
-        discord_rows = cursor.fetchall()
-        logger.info(f"Found {len(discord_rows)} Discord messages to analyze")
-        
-        for i in range(0, len(discord_rows), batch_size):
-            batch = discord_rows[i:i + batch_size]
-            for msg_id, content in batch:
+def stream_batches(cursor, batch_size):
+    """Group rows from a server-side cursor into lists of batch_size"""
+    batch = []
+    for row in cursor:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def analyze_and_store(batch_size=500):
+    # Rows are streamed from a named cursor on read_conn while results are committed
+    # on conn; committing on the reading connection would close the cursor
+    with get_conn() as conn, get_conn() as read_conn:
+        if not conn or not read_conn:
+            logger.error("Database connection failed")
+            return
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT NOT EXISTS (SELECT 1 FROM sentiment_analysis)")
+            use_copy = cursor.fetchone()[0]
+            prepare_insert(cursor)
+            conn.commit()
+            if use_copy:
+                logger.info("sentiment_analysis is empty, using COPY for the initial backfill")
+
+            # Both sources come through one stream, tagged with their platform
+            stream = read_conn.cursor(name='content_stream', withhold=False)
+            stream.itersize = 10000
+            # Only rows without a sentiment_analysis entry, so re-runs cost O(new rows)
+            stream.execute("""
+                SELECT dm.message_id AS id, dm.content, 'discord' AS platform, dm.token_ids
+                FROM discord_messages dm
+                LEFT JOIN sentiment_analysis sa
+                  ON sa.message_id = dm.message_id AND sa.platform = 'discord'
+                WHERE dm.content IS NOT NULL AND sa.message_id IS NULL
+                UNION ALL
+                SELECT bp.post_id, bp.content, 'bluesky', bp.token_ids
+                FROM bluesky_posts bp
+                LEFT JOIN sentiment_analysis sa
+                  ON sa.message_id = bp.post_id AND sa.platform = 'bluesky'
+                WHERE bp.content IS NOT NULL AND sa.message_id IS NULL
+            """)
+            counts = Counter()
+            cache_hits = 0
+            for batch_num, batch in enumerate(stream_batches(stream, batch_size), 1):
+                counts.update(row[2] for row in batch)
                 try:
-                    # Skip empty content
-                    if not content or len(content.strip()) == 0:
-                        continue
-                    
-                    result = sentiment_classifier(content)[0]
-                    cursor.execute("""
-                        INSERT INTO sentiment_analysis (message_id, platform, sentiment, confidence)
-                        VALUES (%s, 'discord', %s, %s)
-                        ON CONFLICT (message_id, platform) DO NOTHING;
-                    """, (msg_id, result['label'], result['score']))
-                    conn.commit()
+                    cache = lookup_sentiment_cache(cursor, batch)
+                    cache_hits += len(cache)
+                    rows, new_entries = classify_batch(batch, cache)
                 except Exception as e:
-                    logger.error(f"Error analyzing Discord message {msg_id}: {e}")
-            logger.info(f"Processed Discord batch {i//batch_size + 1} - {len(batch)} messages")
-        
-        # Bluesky posts
-        cursor.execute("SELECT post_id, content FROM bluesky_posts WHERE content IS NOT NULL")
-        bluesky_rows = cursor.fetchall()
-        logger.info(f"Found {len(bluesky_rows)} Bluesky posts to analyze")
-        
-        for i in range(0, len(bluesky_rows), batch_size):
-            batch = bluesky_rows[i:i + batch_size]
-            for post_id, content in batch:
+                    logger.error(f"Error analyzing batch {batch_num}: {e}")
+                    continue
                 try:
-                    # Skip empty content
-                    if not content or len(content.strip()) == 0:
-                        continue
-                        
-                    result = sentiment_classifier(content)[0]
-                    cursor.execute("""
-                        INSERT INTO sentiment_analysis (message_id, platform, sentiment, confidence)
-                        VALUES (%s, 'bluesky', %s, %s)
-                        ON CONFLICT (message_id, platform) DO NOTHING;
-                    """, (post_id, result['label'], result['score']))
+                    store_results(cursor, rows, use_copy)
+                    store_cache_entries(cursor, new_entries)
                     conn.commit()
                 except Exception as e:
-                    logger.error(f"Error analyzing Bluesky post {post_id}: {e}")
-            logger.info(f"Processed Bluesky batch {i//batch_size + 1} - {len(batch)} posts")
-    except Exception as e:
-        logger.error(f"Error during sentiment analysis: {e}")
-    finally:
-        cursor.close()
-        conn.close()
+                    conn.rollback()
+                    logger.error(f"Error storing batch {batch_num}: {e}")
+                logger.info(f"Processed batch {batch_num} - {len(batch)} messages")
+            stream.close()
+            read_conn.commit()
+            logger.info(f"Analyzed {counts['discord']} new Discord messages and {counts['bluesky']} new Bluesky posts")
+            # Tells whether the fingerprint table is paying for itself on this corpus
+            logger.info(f"{cache_hits} distinct texts reused cached sentiment results")
+        except Exception as e:
+            logger.error(f"Error during sentiment analysis: {e}")
+        finally:
+            cursor.close()
     logger.info("Sentiment analysis complete")
 
 if __name__ == "__main__":
     create_sentiment_table()
-    analyze_and_store() 
\ No newline at end of file
+    ensure_token_columns()
+    analyze_and_store()
+    if ensure_report_objects():
+        refresh_report_views() 
\ No newline at end of file
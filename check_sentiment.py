@@ -48,14 +48,13 @@ def check_sentiment_distribution():
     logger.info(f"Positive sentiment with confidence > 0.8: {high_confidence_positive}")
     
     # Get most recent positive sentiment with high confidence
+    # v_posts is created by db.ensure_report_objects (run by analyze_sentiment.py)
     cursor.execute("""
-        SELECT sa.message_id, sa.platform, sa.sentiment, sa.confidence, 
-               COALESCE(dm.content, bp.content), COALESCE(dm.timestamp, bp.timestamp)
+        SELECT sa.message_id, sa.platform, sa.sentiment, sa.confidence, v.content, v.timestamp
         FROM sentiment_analysis sa
-        LEFT JOIN discord_messages dm ON sa.message_id = dm.message_id AND sa.platform = 'discord'
-        LEFT JOIN bluesky_posts bp ON sa.message_id = bp.post_id AND sa.platform = 'bluesky'
+        JOIN v_posts v ON v.id = sa.message_id AND v.platform = sa.platform
         WHERE sa.sentiment = 'POSITIVE' AND sa.confidence > 0.8
-        ORDER BY COALESCE(dm.timestamp, bp.timestamp) DESC
+        ORDER BY v.timestamp DESC
         LIMIT 5
     """)
     recent_positive = cursor.fetchall()
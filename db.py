@@ -1,51 +1,234 @@
-import psycopg2
 from psycopg2 import Error
+from psycopg2.pool import ThreadedConnectionPool
+from contextlib import contextmanager
+import io
+import threading
+import sys
+
+DB_SETTINGS = {
+    "dbname": "socialinsight_db",
+    "user": "george",
+    "password": "mypassword",
+    "host": "localhost",
+    "port": "5432"
+}
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+def _get_pool():
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ThreadedConnectionPool(1, 10, **DB_SETTINGS)
+    return _POOL
 
 def get_db_connection():
     try:
-        conn = psycopg2.connect(
-            dbname="socialinsight_db",
-            user="george",
-            password="mypassword",
-            host="localhost",
-            port="5432"
-        )
-        return conn
+        return _get_pool().getconn()
     except Error as e:
         print(f"Error connecting to database: {e}")
         return None
 
-def init_db():
+def put_db_connection(conn):
+    # The pool rolls back anything left uncommitted before handing the connection out again
+    _get_pool().putconn(conn)
+
+def format_copy_value(value):
+    """Render a value as a field of COPY's text format"""
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+def staging_table_sql(stage, table, columns, on_commit="DROP", if_not_exists=False):
+    """CREATE TEMP TABLE statement for staging COPYed `columns` of `table`
+
+    COPY cannot skip rows that conflict, so bulk writes COPY into a staging table
+    and merge it with merge_staged_sql. CREATE TABLE AS over just the copied
+    columns takes their types but none of the table's constraints or defaults;
+    LIKE would still copy NOT NULL on columns the COPY never fills (the SERIAL id).
+    """
+    exists = "IF NOT EXISTS " if if_not_exists else ""
+    return (f"CREATE TEMP TABLE {exists}{stage} ON COMMIT {on_commit} AS "
+            f"SELECT {', '.join(columns)} FROM {table} WITH NO DATA")
+
+def merge_staged_sql(stage, table, columns, conflict, update=()):
+    """INSERT ... SELECT statement merging a staging table into `table`
+
+    Rows conflicting on the `conflict` columns are skipped, or have their `update`
+    columns overwritten when any are given. DO UPDATE cannot touch the same row
+    twice in one statement, so that case keeps one staged row per key.
+    """
+    cols = ', '.join(columns)
+    keys = ', '.join(conflict)
+    if not update:
+        return (f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {stage} "
+                f"ON CONFLICT ({keys}) DO NOTHING")
+    assignments = ', '.join(f"{col} = EXCLUDED.{col}" for col in update)
+    return (f"INSERT INTO {table} ({cols}) SELECT DISTINCT ON ({keys}) {cols} FROM {stage} "
+            f"ORDER BY {keys} ON CONFLICT ({keys}) DO UPDATE SET {assignments}")
+
+def copy_merge(cursor, table, columns, rows, conflict, update=()):
+    """COPY rows into a temp staging table and merge them into `table`
+
+    The staging table is dropped at commit, so call this once per table per
+    transaction. Returns the number of rows inserted or updated.
+    """
+    stage = f"stg_{table}"
+    cursor.execute(staging_table_sql(stage, table, columns))
+    buf = io.StringIO(''.join('\t'.join(format_copy_value(v) for v in row) + '\n' for row in rows))
+    cursor.copy_expert(f"COPY {stage} ({', '.join(columns)}) FROM STDIN", buf)
+    cursor.execute(merge_staged_sql(stage, table, columns, conflict, update))
+    return cursor.rowcount
+
+@contextmanager
+def get_conn():
     conn = get_db_connection()
-    if conn is None:
-        return
-    cursor = conn.cursor()
-    # Table for Discord data
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS discord_messages (
-            id SERIAL PRIMARY KEY,
-            message_id VARCHAR(50) UNIQUE,
-            content TEXT,
-            timestamp TIMESTAMP,
-            channel_id VARCHAR(50),
-            user_id VARCHAR(50)
-        );
-    """)
-    # Table for Bluesky data
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS bluesky_posts (
-            id SERIAL PRIMARY KEY,
-            post_id VARCHAR(100) UNIQUE,
-            content TEXT,
-            timestamp TIMESTAMP,
-            user_did VARCHAR(100),
-            likes INTEGER
-        );
-    """)
-    conn.commit()
-    cursor.close()
-    conn.close()
+    try:
+        yield conn
+    finally:
+        if conn is not None:
+            put_db_connection(conn)
+
+async def create_async_pool(min_size=1, max_size=10):
+    """Create an asyncpg pool for code running inside an event loop"""
+    import asyncpg
+    return await asyncpg.create_pool(
+        database=DB_SETTINGS["dbname"],
+        user=DB_SETTINGS["user"],
+        password=DB_SETTINGS["password"],
+        host=DB_SETTINGS["host"],
+        port=int(DB_SETTINGS["port"]),
+        min_size=min_size,
+        max_size=max_size
+    )
+
+def init_db():
+    with get_conn() as conn:
+        if conn is None:
+            return
+        cursor = conn.cursor()
+        # Table for Discord data
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS discord_messages (
+                id SERIAL PRIMARY KEY,
+                message_id VARCHAR(50) UNIQUE,
+                content TEXT,
+                timestamp TIMESTAMP,
+                channel_id VARCHAR(50),
+                user_id VARCHAR(50),
+                guild_id VARCHAR(50)
+            );
+        """)
+        # Tables created before guild_id was part of the schema; sentiment_bot.py writes it
+        cursor.execute("ALTER TABLE discord_messages ADD COLUMN IF NOT EXISTS guild_id VARCHAR(50)")
+        # Table for Bluesky data
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bluesky_posts (
+                id SERIAL PRIMARY KEY,
+                post_id VARCHAR(100) UNIQUE,
+                content TEXT,
+                timestamp TIMESTAMP,
+                user_did VARCHAR(100),
+                likes INTEGER
+            );
+        """)
+        conn.commit()
+        cursor.close()
+    ensure_token_columns()
     print("Database initialized.")
 
+def ensure_token_columns():
+    """Add the columns that memoize each message's tokenization (see token_ids.py)"""
+    with get_conn() as conn:
+        if conn is None:
+            return False
+        cursor = conn.cursor()
+        for table in ("discord_messages", "bluesky_posts"):
+            cursor.execute(f"""
+                ALTER TABLE {table}
+                ADD COLUMN IF NOT EXISTS token_ids BYTEA,
+                ADD COLUMN IF NOT EXISTS token_len INTEGER
+            """)
+        conn.commit()
+        cursor.close()
+    return True
+
+REPORT_OBJECTS = [
+    # Filled by sentiment_bot's topic backfill; report_sentiment.py joins it live
+    "ALTER TABLE sentiment_analysis ADD COLUMN IF NOT EXISTS topics VARCHAR(100)",
+    # Keyset pages of sentiment_bot's topic backfill; shrinks as rows get tagged
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sa_untagged
+       ON sentiment_analysis (platform, id) WHERE topics IS NULL""",
+    # Partial index stays small: the report only ever looks at positive rows
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sa_pos
+       ON sentiment_analysis (platform, confidence DESC) WHERE sentiment = 'POSITIVE'""",
+    # sentiment_bot.py walks idx_dm_ts / idx_bp_ts newest first and probes this per row,
+    # so its LIMIT stops early and the sentiment_analysis side never touches the heap
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sa_pos_msg
+       ON sentiment_analysis (message_id, platform) INCLUDE (confidence, topics)
+       WHERE sentiment = 'POSITIVE'""",
+    # content is left out of INCLUDE since long messages would exceed the btree row limit
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_dm_msgid_ts
+       ON discord_messages (message_id) INCLUDE (timestamp, user_id)""",
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bp_postid_ts
+       ON bluesky_posts (post_id) INCLUDE (timestamp, user_did)""",
+    """CREATE MATERIALIZED VIEW IF NOT EXISTS mv_recent_positive AS
+       SELECT sa.message_id, sa.platform, sa.sentiment, sa.confidence, sa.topics,
+              dm.content, dm.timestamp, dm.user_id AS author_id
+       FROM sentiment_analysis sa
+       JOIN discord_messages dm ON sa.message_id = dm.message_id
+       WHERE sa.platform = 'discord' AND sa.sentiment = 'POSITIVE' AND sa.confidence > 0.8
+       UNION ALL
+       SELECT sa.message_id, sa.platform, sa.sentiment, sa.confidence, sa.topics,
+              bp.content, bp.timestamp, bp.user_did AS author_id
+       FROM sentiment_analysis sa
+       JOIN bluesky_posts bp ON sa.message_id = bp.post_id
+       WHERE sa.platform = 'bluesky' AND sa.sentiment = 'POSITIVE' AND sa.confidence > 0.8""",
+    # Single content/timestamp source for both platforms so top-N by time can use
+    # the per-table timestamp indexes instead of sorting a COALESCE expression
+    """CREATE OR REPLACE VIEW v_posts AS
+       SELECT message_id AS id, 'discord' AS platform, content, timestamp FROM discord_messages
+       UNION ALL
+       SELECT post_id, 'bluesky', content, timestamp FROM bluesky_posts""",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_dm_ts ON discord_messages (timestamp DESC)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bp_ts ON bluesky_posts (timestamp DESC)",
+    # Unique index is required for REFRESH ... CONCURRENTLY
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_rp_key ON mv_recent_positive (message_id, platform)",
+    """CREATE INDEX IF NOT EXISTS idx_mv_rp_top
+       ON mv_recent_positive (platform, confidence DESC, timestamp DESC)""",
+]
+
+def _run_autocommit(statements):
+    # CREATE INDEX CONCURRENTLY and REFRESH ... CONCURRENTLY cannot run inside a transaction
+    with get_conn() as conn:
+        if conn is None:
+            return False
+        conn.autocommit = True
+        cursor = conn.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+            return True
+        except Error as e:
+            print(f"Error creating report objects: {e}")
+            return False
+        finally:
+            cursor.close()
+            conn.autocommit = False
+
+def ensure_report_objects():
+    """Create the indexes and views used by report_sentiment.py, check_sentiment.py and sentiment_bot.py"""
+    return _run_autocommit(REPORT_OBJECTS)
+
+def refresh_report_views():
+    """Refresh mv_recent_positive; run after analysis, after sentiment_bot's topic backfill and from a nightly job"""
+    return _run_autocommit(["REFRESH MATERIALIZED VIEW CONCURRENTLY mv_recent_positive"])
+
 if __name__ == "__main__":
-    init_db()
+    if "--refresh-views" in sys.argv:
+        refresh_report_views()
+    else:
+        init_db()
@@ -1,42 +1,105 @@
+import asyncio
+import logging
+import sys
 import discord
 from discord.ext import commands
-from db import get_db_connection
+from db import create_async_pool, staging_table_sql, merge_staged_sql
 from config import DISCORD_TOKEN
 
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s', stream=sys.stderr)
+logger = logging.getLogger(__name__)
+
+# Messages are queued by on_message and written by a background task so the
+# event loop never blocks on the database
+FLUSH_BATCH_SIZE = 500
+FLUSH_INTERVAL = 2.0
+COLUMNS = ("message_id", "content", "timestamp", "channel_id", "user_id")
+
+pool = None
+queue = asyncio.Queue()
+# Queued by close() so the flusher writes what it holds and exits
+STOP = None
+
+async def write_batch(batch):
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            # COPY cannot skip existing rows, so stage the batch and merge it
+            await conn.execute(staging_table_sql("stg_discord_live", "discord_messages", COLUMNS,
+                                                 on_commit="DELETE ROWS", if_not_exists=True))
+            await conn.copy_records_to_table("stg_discord_live", records=batch, columns=COLUMNS)
+            await conn.execute(merge_staged_sql("stg_discord_live", "discord_messages", COLUMNS,
+                                                conflict=("message_id",)))
+
+async def flusher():
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        message = await queue.get()
+        if message is STOP:
+            break
+        batch = [message]
+        deadline = loop.time() + FLUSH_INTERVAL
+        while len(batch) < FLUSH_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if message is STOP:
+                stopping = True
+                break
+            batch.append(message)
+        try:
+            await write_batch(batch)
+            logger.debug(f"Stored {len(batch)} messages")
+        except Exception as e:
+            logger.error(f"Error storing {len(batch)} messages: {e}")
+
+class CollectorBot(commands.Bot):
+    flush_task = None
+
+    async def setup_hook(self):
+        global pool
+        pool = await create_async_pool()
+        self.flush_task = asyncio.create_task(flusher())
+
+    async def close(self):
+        # Drain the queue before disconnecting so messages received just before
+        # shutdown are still written
+        global pool
+        try:
+            if self.flush_task is not None:
+                queue.put_nowait(STOP)
+                await self.flush_task
+                self.flush_task = None
+            if pool is not None:
+                await pool.close()
+                pool = None
+        finally:
+            await super().close()
+
 intents = discord.Intents.default()
 intents.messages = True
 intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot = CollectorBot(command_prefix="!", intents=intents)
 
 @bot.event
 async def on_ready():
-    print(f"Logged in as {bot.user}")
+    logger.info(f"Logged in as {bot.user}")
 
 @bot.event
 async def on_message(message):
     if message.author == bot.user:
         return
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                INSERT INTO discord_messages (message_id, content, timestamp, channel_id, user_id)
-                VALUES (%s, %s, %s, %s, %s)
-                ON CONFLICT (message_id) DO NOTHING;
-            """, (
-                str(message.id),
-                message.content,
-                message.created_at,
-                str(message.channel.id),
-                str(message.author.id)
-            ))
-            conn.commit()
-            print(f"Stored message {message.id}")
-        except Exception as e:
-            print(f"Error storing message: {e}")
-        finally:
-            cursor.close()
-            conn.close()
+    queue.put_nowait((
+        str(message.id),
+        message.content,
+        # discord.py timestamps are aware UTC; the column is a naive TIMESTAMP
+        message.created_at.replace(tzinfo=None),
+        str(message.channel.id),
+        str(message.author.id)
+    ))
 
 bot.run(DISCORD_TOKEN)
@@ -1,72 +1,182 @@
 import json
+import logging
 import os
-from db import get_db_connection
+import sys
+import tempfile
+import itertools
+import ijson
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from db import get_conn, ensure_token_columns, format_copy_value, staging_table_sql, merge_staged_sql
+from token_ids import tokenize, pack_token_ids
 
-def import_message_data(file_paths, batch_size=50):
-    imported = 0
-    for i in range(0, len(file_paths), batch_size):
-        batch = file_paths[i:i + batch_size]
-        conn = get_db_connection()
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s', stream=sys.stderr)
+logger = logging.getLogger(__name__)
+
+PROGRESS_EVERY = 1000
+
+COPY_COLUMNS = ("message_id", "content", "timestamp", "channel_id", "user_id", "token_ids", "token_len")
+
+def _message_row(msg):
+    author = msg.get('author')
+    return (
+        str(msg.get('id', '')),
+        msg.get('content', ''),
+        msg.get('timestamp', None),
+        str(msg.get('channel_id', '')),
+        str(author.get('id', '')) if isinstance(author, dict) else str(msg.get('user_id', ''))
+    )
+
+COPY_CHUNK_ROWS = 10000
+# Files parsed ahead of the COPY per worker; bounds how much finished output waits on disk
+FILES_IN_FLIGHT_PER_WORKER = 2
+
+def _iter_messages(f):
+    """Yield messages from an export without materializing the whole document"""
+    # Detect the format from the first byte past the BOM and any amount of whitespace
+    if f.read(3) != b'\xef\xbb\xbf':
+        f.seek(0)
+    first = b''
+    while not first:
+        chunk = f.read(4096)
+        if not chunk:
+            break
+        first = chunk.lstrip(b' \t\r\n')[:1]
+    f.seek(0)
+    if first == b'[':
+        yield from ijson.items(f, 'item', use_float=True)
+    else:
+        # Single-message exports are one small object
+        yield json.load(f)
+
+def _format_chunk(rows):
+    """Tokenize a chunk of message rows and render them as COPY text
+
+    Tokenizing here, in the import workers, means analyze_sentiment.py can read
+    the ids back instead of tokenizing the corpus itself.
+    """
+    contents = [row[1] or '' for row in rows]
+    lines = []
+    for row, ids in zip(rows, tokenize(contents)):
+        # bytea in COPY text format is \x-prefixed hex
+        token_fields = ('\\x' + pack_token_ids(ids).hex(), len(ids)) if row[1] else (None, None)
+        lines.append('\t'.join(format_copy_value(v) for v in row + token_fields) + '\n')
+    return ''.join(lines)
+
+def _parse_file(file_path):
+    """Parse one export file into a temp file of COPY text, run in a worker process
+
+    Rows are tokenized and written out COPY_CHUNK_ROWS at a time, so a worker's
+    memory stays flat however large the export is, and only a path travels back
+    to the parent. Returns (file_path, copy_path, message_count, error); the
+    caller removes copy_path.
+    """
+    copy_path = None
+    try:
+        rows = []
+        count = 0
+        with open(file_path, 'rb') as f, \
+                tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.copy', delete=False) as out:
+            copy_path = out.name
+            for msg in _iter_messages(f):
+                rows.append(_message_row(msg))
+                count += 1
+                if len(rows) >= COPY_CHUNK_ROWS:
+                    out.write(_format_chunk(rows))
+                    rows = []
+            if rows:
+                out.write(_format_chunk(rows))
+        return file_path, copy_path, count, None
+    except Exception as e:
+        if copy_path:
+            os.remove(copy_path)
+        return file_path, None, 0, str(e)
+
+def _parse_files(ex, file_paths, window):
+    """Yield _parse_file results as workers finish, with at most `window` files in flight
+
+    The next file is only submitted once the caller has consumed a result, so
+    parsing never runs further ahead of the COPY than the window.
+    """
+    paths = iter(file_paths)
+    pending = {ex.submit(_parse_file, path) for path in itertools.islice(paths, window)}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+            path = next(paths, None)
+            if path is not None:
+                pending.add(ex.submit(_parse_file, path))
+
+def import_message_data(file_paths):
+    with get_conn() as conn:
         if not conn:
-            print(f"Database connection failed for batch starting at {batch[0]}")
-            return imported
+            logger.error("Database connection failed")
+            return 0
         cursor = conn.cursor()
         try:
-            for file_path in batch:
-                print(f"Processing {file_path}")
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        messages = [data] if isinstance(data, dict) else data
-                        for msg in messages:
-                            try:
-                                cursor.execute("""
-                                    INSERT INTO discord_messages (message_id, content, timestamp, channel_id, user_id)
-                                    VALUES (%s, %s, %s, %s, %s)
-                                    ON CONFLICT (message_id) DO NOTHING;
-                                """, (
-                                    str(msg.get('id', '')),
-                                    msg.get('content', ''),
-                                    msg.get('timestamp', None),
-                                    str(msg.get('channel_id', '')),
-                                    str(msg.get('author', {}).get('id', '')) if isinstance(msg.get('author'), dict) else str(msg.get('user_id', ''))
-                                ))
-                                conn.commit()
-                                imported += 1
-                                print(f"Imported message {msg.get('id')} from {file_path}")
-                            except Exception as e:
-                                print(f"Error importing message in {file_path}: {e}")
-                except Exception as e:
-                    print(f"Error reading {file_path}: {e}")
+            # Rows are COPYed into a staging table first because COPY cannot skip
+            # messages that are already in discord_messages
+            staged = 0
+            cursor.execute(staging_table_sql("stg_discord", "discord_messages", COPY_COLUMNS))
+            # JSON decoding is CPU-bound, so workers parse files while this process
+            # streams the finished ones into Postgres
+            workers = os.cpu_count()
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                for file_path, copy_path, count, error in _parse_files(ex, file_paths, workers * FILES_IN_FLIGHT_PER_WORKER):
+                    if error:
+                        logger.error(f"Error reading {file_path}: {error}")
+                        continue
+                    try:
+                        cursor.execute("SAVEPOINT import_file")
+                        # copy_expert streams the file in small reads
+                        with open(copy_path, 'r', encoding='utf-8') as copy_file:
+                            cursor.copy_expert(f"COPY stg_discord ({', '.join(COPY_COLUMNS)}) FROM STDIN", copy_file)
+                        cursor.execute("RELEASE SAVEPOINT import_file")
+                        logger.debug(f"Staged {count} messages from {file_path}")
+                        staged += count
+                        if staged // PROGRESS_EVERY > (staged - count) // PROGRESS_EVERY:
+                            logger.info(f"{staged} messages staged")
+                    except Exception as e:
+                        cursor.execute("ROLLBACK TO SAVEPOINT import_file")
+                        logger.error(f"Error importing {file_path}: {e}")
+                    finally:
+                        os.remove(copy_path)
+            cursor.execute(merge_staged_sql("stg_discord", "discord_messages", COPY_COLUMNS, conflict=("message_id",)))
+            imported = cursor.rowcount
+            conn.commit()
+            return imported
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error importing messages: {e}")
+            return 0
         finally:
             cursor.close()
-            conn.close()
-    return imported
 
 def import_relationship_data(file_path):
-    print(f"Skipping relationship file {file_path} - no parsing implemented")
+    logger.info(f"Skipping relationship file {file_path} - no parsing implemented")
     return 0
 
 def main():
     data_dir = "C:/Users/w1n51/OneDrive/Desktop/Programing Projects/SocialInsightAI/discord_data/data"
     if not os.path.exists(data_dir):
         os.makedirs(data_dir)
-        print(f"Created {data_dir} - please move your JSON files there and rerun")
+        logger.info(f"Created {data_dir} - please move your JSON files there and rerun")
         return
+    ensure_token_columns()
     all_files = [os.path.join(data_dir, f) for f in os.listdir(data_dir) if f.endswith('.json')]
     message_files = [f for f in all_files if 'message' in f.lower()]
     relationship_files = [f for f in all_files if 'relationship' in f.lower()]
     # Test run on first 5 message files
-    print("Testing import on first 5 message files...")
+    logger.info("Testing import on first 5 message files...")
     test_files = message_files[:5]
     test_imported = import_message_data(test_files)
-    print(f"Test complete - {test_imported} messages imported")
+    logger.info(f"Test complete - {test_imported} messages imported")
     # Full run
-    print("Starting full import...")
+    logger.info("Starting full import...")
     total_imported = import_message_data(message_files)
     for file_path in relationship_files:
         total_imported += import_relationship_data(file_path)
-    print(f"Full import complete - {total_imported} messages imported")
+    logger.info(f"Full import complete - {total_imported} messages imported")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -23,6 +23,63 @@ def get_db_connection():
         logger.error(f"Database connection error: {e}")
         return None
 
+# mv_recent_positive (see db.ensure_report_objects) only holds rows above this confidence
+VIEW_MIN_CONFIDENCE = 0.8
+
+BASE_QUERIES = {
+    'discord': """
+        SELECT sa.message_id, sa.sentiment, sa.confidence, sa.topics, 
+               dm.content, dm.timestamp, dm.user_id
+        FROM sentiment_analysis sa
+        JOIN discord_messages dm ON sa.message_id = dm.message_id
+        WHERE sa.platform = 'discord' 
+          AND sa.sentiment = 'POSITIVE' 
+          AND sa.confidence > %s
+          AND dm.timestamp > %s
+        ORDER BY sa.confidence DESC, dm.timestamp DESC
+        LIMIT %s
+    """,
+    'bluesky': """
+        SELECT sa.message_id, sa.sentiment, sa.confidence, sa.topics, 
+               bp.content, bp.timestamp, bp.user_did
+        FROM sentiment_analysis sa
+        JOIN bluesky_posts bp ON sa.message_id = bp.post_id
+        WHERE sa.platform = 'bluesky' 
+          AND sa.sentiment = 'POSITIVE' 
+          AND sa.confidence > %s
+          AND bp.timestamp > %s
+        ORDER BY sa.confidence DESC, bp.timestamp DESC
+        LIMIT %s
+    """,
+}
+
+def fetch_top_posts(cursor, platform, min_confidence, time_window, top_n):
+    """Fetch the top positive posts for a platform
+
+    Pages the precomputed mv_recent_positive view when it exists and covers the
+    requested confidence threshold, otherwise joins the base tables. Topics are
+    tagged after the view is refreshed, so they are always read live from
+    sentiment_analysis.
+
+    Returns:
+        list: (id, sentiment, confidence, topics, content, timestamp, author) rows
+    """
+    cursor.execute("SELECT to_regclass('mv_recent_positive') IS NOT NULL")
+    if min_confidence >= VIEW_MIN_CONFIDENCE and cursor.fetchone()[0]:
+        cursor.execute("""
+            SELECT mv.message_id, mv.sentiment, mv.confidence, sa.topics,
+                   mv.content, mv.timestamp, mv.author_id
+            FROM mv_recent_positive mv
+            JOIN sentiment_analysis sa
+              ON sa.message_id = mv.message_id AND sa.platform = mv.platform
+            WHERE mv.platform = %s AND mv.confidence > %s AND mv.timestamp > %s
+            ORDER BY mv.confidence DESC, mv.timestamp DESC
+            LIMIT %s
+        """, (platform, min_confidence, time_window, top_n))
+    else:
+        cursor.execute(BASE_QUERIES[platform], (min_confidence, time_window, top_n))
+    return cursor.fetchall()
+
 def generate_sentiment_report(days=30, min_confidence=0.8, top_n=10):
     """Generate a report of the top positive sentiment posts per platform
     
@@ -54,20 +111,7 @@ def generate_sentiment_report(days=30, min_confidence=0.8, top_n=10):
             f.write("DISCORD POSTS:\n")
             f.write("-" * 80 + "\n\n")
             
-            cursor.execute("""
-                SELECT sa.message_id, sa.sentiment, sa.confidence, sa.topics, 
-                       dm.content, dm.timestamp, dm.user_id
-                FROM sentiment_analysis sa
-                JOIN discord_messages dm ON sa.message_id = dm.message_id
-                WHERE sa.platform = 'discord' 
-                  AND sa.sentiment = 'POSITIVE' 
-                  AND sa.confidence > %s
-                  AND dm.timestamp > %s
-                ORDER BY sa.confidence DESC, dm.timestamp DESC
-                LIMIT %s
-            """, (min_confidence, time_window, top_n))
-            
-            discord_posts = cursor.fetchall()
+            discord_posts = fetch_top_posts(cursor, 'discord', min_confidence, time_window, top_n)
             
             if not discord_posts:
                 f.write("No Discord posts found.\n\n")
@@ -85,20 +129,7 @@ def generate_sentiment_report(days=30, min_confidence=0.8, top_n=10):
             f.write("\nBLUESKY POSTS:\n")
             f.write("-" * 80 + "\n\n")
             
-            cursor.execute("""
-                SELECT sa.message_id, sa.sentiment, sa.confidence, sa.topics, 
-                       bp.content, bp.timestamp, bp.user_did
-                FROM sentiment_analysis sa
-                JOIN bluesky_posts bp ON sa.message_id = bp.post_id
-                WHERE sa.platform = 'bluesky' 
-                  AND sa.sentiment = 'POSITIVE' 
-                  AND sa.confidence > %s
-                  AND bp.timestamp > %s
-                ORDER BY sa.confidence DESC, bp.timestamp DESC
-                LIMIT %s
-            """, (min_confidence, time_window, top_n))
-            
-            bluesky_posts = cursor.fetchall()
+            bluesky_posts = fetch_top_posts(cursor, 'bluesky', min_confidence, time_window, top_n)
             
             if not bluesky_posts:
                 f.write("No Bluesky posts found.\n\n")
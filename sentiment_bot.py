@@ -1,31 +1,51 @@
 import tweepy
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from atproto import Client
 import psycopg2
+import psycopg2.errors
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import execute_values
 import discord
 from config import BLUESKY_USERNAME, BLUESKY_PASSWORD, X_API_KEY, X_API_SECRET, X_ACCESS_TOKEN, X_ACCESS_TOKEN_SECRET
 from config import DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DISCORD_TOKEN
+from token_ids import MODEL_NAME, ONNX_MODEL_DIR, load_quantized_model
+from db import copy_merge, refresh_report_views
 import logging
 from datetime import datetime, timedelta
 import argparse
 import sys
 import nltk
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from collections import Counter
+from collections import Counter, OrderedDict
+from functools import lru_cache
 import re
 import string
+import hashlib
 import time
 import json
 import os
 import asyncio
+import random
+import itertools
+import signal
+import atexit
+import contextlib
+import tempfile
+import threading
 
-# Download necessary NLTK resources
+# Download necessary NLTK resources (only the stopword list is used)
 try:
-    nltk.data.find('tokenizers/punkt')
     nltk.data.find('corpora/stopwords')
 except LookupError:
-    nltk.download('punkt')
-    nltk.download('stopwords')
+    nltk.download('stopwords', quiet=True)
+
+# Built once at import; also seeds topic_stopwords for the SQL backfill
+_STOP_WORDS = frozenset(stopwords.words('english')) | {
+    'just', 'like', 'get', 'got', 'know', 'yeah', 'dont', 'thats', 'really', 'going', 'think', 'said'
+}
+_PUNCT_TABLE = str.maketrans('', '', string.punctuation)
+_URL_RE = re.compile(r'http\S+')
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
@@ -37,27 +57,110 @@ bsky_client = None
 discord_client = None
 
 # File to store processed IDs
-PROCESSED_X_IDS_FILE = "processed_x_ids.json"
-PROCESSED_DISCORD_IDS_FILE = "processed_discord_ids.json"
+PROCESSED_X_IDS_FILE = "processed_x_ids.txt"
+PROCESSED_DISCORD_IDS_FILE = "processed_discord_ids.txt"
+
+# Cached Bluesky session so scheduled runs don't log in every time
+BSKY_SESSION_FILE = os.path.expanduser("~/.cache/pulsecheck_bsky.json")
+BSKY_SESSION_MAX_AGE = 23 * 3600
+
+# Connections are pooled so repeated runs in one process skip connect and auth
+DB_POOL_MAX = 4
+_db_pool = None
 
 def get_db_connection():
-    """Create a database connection to the PostgreSQL database"""
+    """Borrow a connection to the PostgreSQL database from the shared pool"""
+    global _db_pool
     try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT
-        )
-        return conn
+        if _db_pool is None:
+            _db_pool = ThreadedConnectionPool(
+                1, DB_POOL_MAX,
+                dbname=DB_NAME,
+                user=DB_USER,
+                password=DB_PASSWORD,
+                host=DB_HOST,
+                port=DB_PORT
+            )
+            atexit.register(_db_pool.closeall)
+        return _db_pool.getconn()
     except Exception as e:
         logger.error(f"Database connection error: {e}")
         return None
 
+def release_db_connection(conn):
+    """Return a connection to the pool, switching off any autocommit left on it"""
+    if not conn.closed and conn.autocommit:
+        conn.autocommit = False
+    _db_pool.putconn(conn)
+
+# Rows fetched, updated and committed per page during topic backfill
+TOPIC_PAGE_SIZE = 1000
+
+# Where positive posts from each source platform get announced: (platforms key, display name)
+POST_TARGETS = {
+    "discord": ("x", "X"),
+    "bluesky": ("bluesky", "Bluesky"),
+}
+
+# Messages per forward pass in analyze_and_store_sentiment
+SENTIMENT_BATCH_SIZE = 32
+
+# Columns written by analyze_and_store_sentiment
+COLLECTED_MESSAGE_COLUMNS = ("message_id", "content", "user_id", "timestamp", "channel_id", "guild_id")
+COLLECTED_SENTIMENT_COLUMNS = ("message_id", "platform", "sentiment", "confidence", "topics", "metadata")
+
+# Maximum concurrent posts per platform
+POST_CONCURRENCY = 8
+MAX_POST_ATTEMPTS = 6
+
+def prepare_summary_query(cursor):
+    """Prepare the positive-posts query once per connection
+    
+    Postgres then skips parsing and planning on every later run of the daemon.
+    The 50 character snippet is cut server-side, and the full content is only
+    sent back for rows that still need topics extracted from it. Empty posts are
+    filtered out here so LIMIT counts only rows that can actually be announced.
+    """
+    cursor.execute("SELECT 1 FROM pg_prepared_statements WHERE name = 'pulsecheck_summary'")
+    if cursor.fetchone():
+        return
+    try:
+        cursor.execute("""
+            PREPARE pulsecheck_summary (timestamp, int, timestamp, int) AS
+            WITH d AS (
+                SELECT sa.message_id, sa.platform, sa.sentiment, sa.confidence,
+                       CASE WHEN sa.topics IS NULL THEN dm.content END AS content,
+                       dm.timestamp, sa.topics,
+                       CASE WHEN length(dm.content) > 50 THEN left(dm.content, 50) || '...' ELSE dm.content END AS snippet
+                FROM sentiment_analysis sa
+                JOIN discord_messages dm ON sa.message_id = dm.message_id
+                WHERE sa.platform = 'discord' AND sa.sentiment = 'POSITIVE' AND sa.confidence > 0.8 
+                  AND dm.timestamp > $1 AND dm.content <> ''
+                ORDER BY dm.timestamp DESC
+                LIMIT $2
+            ), b AS (
+                SELECT sa.message_id, sa.platform, sa.sentiment, sa.confidence,
+                       CASE WHEN sa.topics IS NULL THEN bp.content END AS content,
+                       bp.timestamp, sa.topics,
+                       CASE WHEN length(bp.content) > 50 THEN left(bp.content, 50) || '...' ELSE bp.content END AS snippet
+                FROM sentiment_analysis sa
+                JOIN bluesky_posts bp ON sa.message_id = bp.post_id
+                WHERE sa.platform = 'bluesky' AND sa.sentiment = 'POSITIVE' AND sa.confidence > 0.8 
+                  AND bp.timestamp > $3 AND bp.content <> ''
+                ORDER BY bp.timestamp DESC
+                LIMIT $4
+            )
+            SELECT * FROM d UNION ALL SELECT * FROM b
+        """)
+    except psycopg2.errors.DuplicatePreparedStatement:
+        cursor.connection.rollback()
+
+@lru_cache(maxsize=20000)
 def extract_topics(text, num_topics=2):
     """Extract key topics from text using frequency analysis
     
+    Results are memoized, so reposts and boilerplate messages are only tokenized once.
+    
     Args:
         text (str): Text to analyze
         num_topics (int): Maximum number of topics to extract
@@ -70,16 +173,14 @@ def extract_topics(text, num_topics=2):
     
     # Clean the text
     text = text.lower()
-    text = re.sub(r'http\S+', '', text)  # Remove URLs
-    text = text.translate(str.maketrans('', '', string.punctuation))  # Remove punctuation
-    
-    # Tokenize and remove stopwords
-    stop_words = set(stopwords.words('english'))
-    additional_stops = {'just', 'like', 'get', 'got', 'know', 'yeah', 'dont', 'thats', 'really', 'going', 'think', 'said'}
-    stop_words.update(additional_stops)
+    text = _URL_RE.sub('', text)  # Remove URLs
+    if not text.strip():
+        return "general"
+    text = text.translate(_PUNCT_TABLE)  # Remove punctuation
     
-    tokens = word_tokenize(text)
-    tokens = [word for word in tokens if word not in stop_words and len(word) > 3]
+    # Tokenize and remove stopwords. Punctuation is already gone, so a whitespace
+    # split gives the same words as word_tokenize without running Punkt
+    tokens = [word for word in text.split() if len(word) > 3 and word not in _STOP_WORDS]
     
     # Count word frequencies
     counter = Counter(tokens)
@@ -131,7 +232,34 @@ def ensure_topics_column_exists():
         return False
     finally:
         cursor.close()
-        conn.close()
+        release_db_connection(conn)
+
+def ensure_posted_log_exists():
+    """Ensure the posted_log table recording sent alerts exists"""
+    conn = get_db_connection()
+    if not conn:
+        logger.error("Database connection failed")
+        return False
+    
+    try:
+        conn.autocommit = True
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS posted_log (
+                id SERIAL PRIMARY KEY,
+                message_id TEXT NOT NULL,
+                platform TEXT NOT NULL,
+                posted_to TEXT NOT NULL,
+                posted_at TIMESTAMP NOT NULL DEFAULT NOW()
+            )
+        """)
+        return True
+    except Exception as e:
+        logger.error(f"Error ensuring posted_log table: {e}")
+        return False
+    finally:
+        cursor.close()
+        release_db_connection(conn)
 
 def ensure_metadata_column_exists():
     """Ensure the metadata column exists in the sentiment_analysis table"""
@@ -168,10 +296,102 @@ def ensure_metadata_column_exists():
         return False
     finally:
         cursor.close()
-        conn.close()
+        release_db_connection(conn)
+
+# Same steps as extract_topics (lowercase, drop URLs and punctuation, split on
+# whitespace, keep stopword-free words over 3 characters, top 2 by count with
+# ties going to the earliest word), run server-side over one keyset page. Empty
+# and short posts never reach the word split and are tagged 'general' like
+# extract_topics does, so they drop out of idx_sa_untagged instead of being
+# stepped over again on every run
+TOPICS_PAGE_SQL = r"""
+    WITH page AS (
+        SELECT sa.id, c.content
+        FROM sentiment_analysis sa
+        JOIN {table} c ON sa.message_id = c.{key}
+        WHERE sa.platform = %(platform)s AND sa.topics IS NULL AND sa.id > %(last_id)s
+        ORDER BY sa.id
+        LIMIT %(page_size)s
+    ), words AS (
+        SELECT p.id, t.word, t.pos
+        FROM page p,
+             regexp_split_to_table(
+                 translate(regexp_replace(lower(p.content), 'http\S+', '', 'g'), %(punctuation)s, ''),
+                 '\s+'
+             ) WITH ORDINALITY AS t(word, pos)
+        WHERE length(p.content) >= 5 AND length(t.word) > 3
+          AND t.word NOT IN (SELECT word FROM topic_stopwords)
+    ), ranked AS (
+        SELECT id, word, row_number() OVER (PARTITION BY id ORDER BY count(*) DESC, min(pos)) AS rn
+        FROM words
+        GROUP BY id, word
+    ), extracted AS (
+        SELECT p.id, COALESCE(left(string_agg(r.word, ', ' ORDER BY r.rn), 95), 'general') AS topics
+        FROM page p
+        LEFT JOIN ranked r ON r.id = p.id AND r.rn <= 2
+        GROUP BY p.id
+    )
+    UPDATE sentiment_analysis sa
+    SET topics = e.topics
+    FROM extracted e
+    WHERE sa.id = e.id
+    RETURNING sa.id
+"""
+
+def ensure_topic_stopwords():
+    """Create and seed the topic_stopwords table TOPICS_PAGE_SQL filters against"""
+    conn = get_db_connection()
+    if not conn:
+        logger.error("Database connection failed")
+        return False
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute("CREATE TABLE IF NOT EXISTS topic_stopwords (word TEXT PRIMARY KEY)")
+        execute_values(cursor, "INSERT INTO topic_stopwords (word) VALUES %s ON CONFLICT DO NOTHING",
+                       [(word,) for word in _STOP_WORDS])
+        conn.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Error ensuring topic_stopwords table: {e}")
+        conn.rollback()
+        return False
+    finally:
+        cursor.close()
+        release_db_connection(conn)
+
+def backfill_topics(conn, cursor, platform, table, key):
+    """Extract topics in SQL for untagged rows of one platform, a page at a time
+    
+    Pages are walked by keyset (id > last_id), so each one costs the same however
+    far the backfill has got, and each is committed before the next one runs.
+    No content is shipped to the client.
+    
+    Returns:
+        int: Number of rows updated
+    """
+    query = TOPICS_PAGE_SQL.format(table=table, key=key)
+    count = 0
+    last_id = 0
+    while True:
+        cursor.execute(query, {
+            "platform": platform,
+            "last_id": last_id,
+            "page_size": TOPIC_PAGE_SIZE,
+            "punctuation": string.punctuation,
+        })
+        ids = [row[0] for row in cursor.fetchall()]
+        conn.commit()
+        count += len(ids)
+        if len(ids) < TOPIC_PAGE_SIZE:
+            return count
+        last_id = max(ids)
 
 def update_topics_in_database():
     """Update the topics column for all sentiment analysis records"""
+    if not ensure_topic_stopwords():
+        return False
+    
     conn = get_db_connection()
     if not conn:
         logger.error("Database connection failed")
@@ -180,43 +400,16 @@ def update_topics_in_database():
     try:
         cursor = conn.cursor()
         
-        # First set all topics to NULL
-        cursor.execute("UPDATE sentiment_analysis SET topics = NULL WHERE topics IS NULL")
+        discord_count = backfill_topics(conn, cursor, 'discord', 'discord_messages', 'message_id')
+        logger.info(f"Updated topics for {discord_count} Discord messages")
         
-        # Process Discord messages
-        cursor.execute("""
-            SELECT sa.id, dm.content 
-            FROM sentiment_analysis sa
-            JOIN discord_messages dm ON sa.message_id = dm.message_id
-            WHERE sa.platform = 'discord' AND sa.topics IS NULL
-            LIMIT 10000
-        """)
-        discord_messages = cursor.fetchall()
+        bluesky_count = backfill_topics(conn, cursor, 'bluesky', 'bluesky_posts', 'post_id')
+        logger.info(f"Updated topics for {bluesky_count} Bluesky posts")
         
-        logger.info(f"Updating topics for {len(discord_messages)} Discord messages")
-        for record_id, content in discord_messages:
-            if content:
-                topics = extract_topics(content)
-                cursor.execute("UPDATE sentiment_analysis SET topics = %s WHERE id = %s", (topics, record_id))
-        
-        # Process Bluesky posts
-        cursor.execute("""
-            SELECT sa.id, bp.content 
-            FROM sentiment_analysis sa
-            JOIN bluesky_posts bp ON sa.message_id = bp.post_id
-            WHERE sa.platform = 'bluesky' AND sa.topics IS NULL
-            LIMIT 10000
-        """)
-        bluesky_posts = cursor.fetchall()
-        
-        logger.info(f"Updating topics for {len(bluesky_posts)} Bluesky posts")
-        for record_id, content in bluesky_posts:
-            if content:
-                topics = extract_topics(content)
-                cursor.execute("UPDATE sentiment_analysis SET topics = %s WHERE id = %s", (topics, record_id))
-        
-        conn.commit()
-        logger.info(f"Updated topics for {len(discord_messages) + len(bluesky_posts)} messages")
+        logger.info(f"Updated topics for {discord_count + bluesky_count} messages")
+        if discord_count + bluesky_count:
+            # Also picks up rows live collection has analyzed since the last analyzer run
+            refresh_report_views()
         return True
     except Exception as e:
         logger.error(f"Error updating topics: {e}")
@@ -224,36 +417,73 @@ def update_topics_in_database():
         return False
     finally:
         cursor.close()
-        conn.close()
+        release_db_connection(conn)
 
-def load_processed_ids(file_path, default=None):
-    """Load processed IDs from file"""
-    if default is None:
-        default = {"ids": []}
-    
-    if not os.path.exists(file_path):
-        return default
+def load_last_processed_id(file_path):
+    """Load the newest processed ID, or None if nothing has been processed
     
+    Discord message IDs and tweet IDs are time-ordered snowflakes, so this
+    high-water mark stands in for the full set of processed IDs. Files holding
+    one ID per line, or the JSON list file older versions wrote next to it,
+    are reduced to their largest ID.
+    """
     try:
         with open(file_path, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return default
+            return max((int(line) for line in f if line.strip().isdigit()), default=None)
+    except FileNotFoundError:
+        pass
+    
+    try:
+        with open(os.path.splitext(file_path)[0] + '.json', 'r') as f:
+            return max((int(id_) for id_ in json.load(f)["ids"] if str(id_).isdigit()), default=None)
+    except (json.JSONDecodeError, FileNotFoundError, KeyError, TypeError):
+        return None
 
-def save_processed_ids(data, file_path):
-    """Save processed IDs to file"""
+def save_last_processed_id(last_id, file_path):
+    """Save the newest processed ID"""
     try:
         with open(file_path, 'w') as f:
-            json.dump(data, f)
+            f.write(f"{last_id}\n")
     except Exception as e:
-        logger.error(f"Error saving processed IDs: {e}")
+        logger.error(f"Error saving last processed ID: {e}")
+
+def load_bsky_session():
+    """Return the cached Bluesky session string, or None if missing or expired"""
+    try:
+        with open(BSKY_SESSION_FILE, 'r') as f:
+            cached = json.load(f)
+        if time.time() - cached["saved_at"] < BSKY_SESSION_MAX_AGE:
+            return cached["session"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+def save_bsky_session(client):
+    """Persist the client's Bluesky session string with a timestamp
+    
+    The session string carries live access and refresh tokens, so it's written to
+    an owner-only (0600) temp file that then atomically replaces the cache.
+    """
+    tmp_path = None
+    try:
+        cache_dir = os.path.dirname(BSKY_SESSION_FILE)
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.pulsecheck_bsky.')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({"saved_at": time.time(), "session": client.export_session_string()}, f)
+        os.replace(tmp_path, BSKY_SESSION_FILE)
+    except Exception as e:
+        logger.warning(f"Could not cache Bluesky session: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
 def authenticate_platforms(target_platforms=None, dry_run=False):
     """Authenticate with X and Bluesky platforms, returning success status
     
     Args:
         target_platforms (list): List of platforms to authenticate with ('x', 'bluesky', 'discord', or any)
-        dry_run (bool): If True, allow partial credentials for dry-run mode
+        dry_run (bool): If True, allow partial credentials and skip the X credential
+            check and Bluesky login, since nothing will be posted
     """
     global x_client, bsky_client, discord_client
     platforms_available = {"x": False, "bluesky": False, "discord": False}
@@ -277,10 +507,22 @@ def authenticate_platforms(target_platforms=None, dry_run=False):
                         access_token_secret=X_ACCESS_TOKEN_SECRET
                     )
                     x_client = tweepy.API(auth)
-                    # Test the connection
-                    x_client.verify_credentials()
-                    platforms_available["x"] = True
-                    logger.info("Successfully authenticated with X")
+                    # tweepy keeps one requests.Session per API object; size its pool for the
+                    # concurrent sends and retry failed connects, which are safe for POSTs
+                    # because nothing was sent (429s are handled in send_post)
+                    x_client.session.mount("https://", HTTPAdapter(
+                        pool_maxsize=POST_CONCURRENCY,
+                        max_retries=Retry(total=3, connect=3, read=0, status=0, backoff_factor=0.5)
+                    ))
+                    if dry_run:
+                        # Nothing is posted; mention collection surfaces bad credentials itself
+                        platforms_available["x"] = True
+                        logger.info("Dry run: skipping X credential check")
+                    else:
+                        # Test the connection
+                        x_client.verify_credentials()
+                        platforms_available["x"] = True
+                        logger.info("Successfully authenticated with X")
                 except Exception as e:
                     logger.error(f"X authentication error with provided credentials: {e}")
                     if dry_run:
@@ -296,11 +538,31 @@ def authenticate_platforms(target_platforms=None, dry_run=False):
     
     if target_platforms and 'bluesky' not in target_platforms:
         logger.info("Bluesky platform not selected, skipping authentication")
+    elif dry_run:
+        # The Bluesky client is only used for posting, so a dry run never needs a
+        # session and shouldn't spend a createSession call on one
+        platforms_available["bluesky"] = True
+        logger.info("Dry run: skipping Bluesky login")
     else:
         # Bluesky setup
         try:
             bsky_client = Client()
-            bsky_client.login(BLUESKY_USERNAME, BLUESKY_PASSWORD)
+            logged_in = False
+            session_string = load_bsky_session()
+            if session_string:
+                try:
+                    bsky_client.login(session_string=session_string)
+                    logged_in = True
+                    logger.info("Resumed cached Bluesky session")
+                except Exception as e:
+                    logger.warning(f"Cached Bluesky session rejected, logging in again: {e}")
+            if not logged_in:
+                bsky_client.login(BLUESKY_USERNAME, BLUESKY_PASSWORD)
+                save_bsky_session(bsky_client)
+            # The client refreshes its access token itself (refreshSession) as it nears
+            # expiry; persisting each refresh lets a restarted daemon resume it too
+            if hasattr(bsky_client, 'on_session_change'):
+                bsky_client.on_session_change(lambda event, session: save_bsky_session(bsky_client))
             platforms_available["bluesky"] = True
             logger.info("Successfully authenticated with Bluesky")
         except Exception as e:
@@ -355,22 +617,22 @@ async def collect_discord_messages(channel_id, limit=10, dry_run=True, simulate=
             } for i in range(1, 4)
         ]
         for msg in simulated_messages:
-            logger.info(f"SIMULATION: Collected from Discord: {msg['content']}")
+            logger.info("SIMULATION: Collected from Discord: %s", msg['content'])
         return simulated_messages
     
-    # Load processed IDs
-    processed_data = load_processed_ids(PROCESSED_DISCORD_IDS_FILE, {"ids": []})
-    processed_ids = set(processed_data["ids"])
+    # Load the newest processed ID
+    last_id = load_last_processed_id(PROCESSED_DISCORD_IDS_FILE)
+    newest_id = last_id
     
     try:
         channel = await discord_client.fetch_channel(channel_id)
         logger.info(f"Connected to Discord channel: {channel.name}")
         
         messages = []
-        async for message in channel.history(limit=limit):
-            # Skip already processed messages
-            if str(message.id) in processed_ids:
-                continue
+        # Only fetch messages newer than the last processed one
+        after = discord.Object(id=last_id) if last_id else None
+        async for message in channel.history(limit=limit, after=after):
+            newest_id = max(newest_id or 0, message.id)
                 
             # Skip bot messages
             if message.author.bot:
@@ -389,15 +651,12 @@ async def collect_discord_messages(channel_id, limit=10, dry_run=True, simulate=
                 "guild_id": str(channel.guild.id) if hasattr(channel, "guild") else None
             })
             
-            # Add to processed IDs
-            processed_ids.add(str(message.id))
-            
             if dry_run:
-                logger.info(f"DRY-RUN: Collected from Discord: {message.content[:100]}{'...' if len(message.content) > 100 else ''}")
+                logger.info("DRY-RUN: Collected from Discord: %.100s%s", message.content, '...' if len(message.content) > 100 else '')
         
-        # Update processed IDs file
-        processed_data["ids"] = list(processed_ids)
-        save_processed_ids(processed_data, PROCESSED_DISCORD_IDS_FILE)
+        # Advance the high-water mark past everything seen this run
+        if newest_id != last_id:
+            save_last_processed_id(newest_id, PROCESSED_DISCORD_IDS_FILE)
         
         logger.info(f"Collected {len(messages)} new Discord messages")
         return messages
@@ -417,10 +676,15 @@ async def collect_discord_messages(channel_id, limit=10, dry_run=True, simulate=
                 } for i in range(1, 4)
             ]
             for msg in simulated_messages:
-                logger.info(f"SIMULATION: Collected from Discord: {msg['content']}")
+                logger.info("SIMULATION: Collected from Discord: %s", msg['content'])
             return simulated_messages
         return []
 
+# Epoch time at which an exhausted mentions_timeline rate-limit window resets; calls
+# before then would only come back as 429s
+_x_mentions_reset_at = 0.0
+X_RATE_LIMIT_WINDOW = 15 * 60
+
 def collect_x_mentions(limit=10, dry_run=True):
     """Collect recent mentions/replies from X
     
@@ -431,23 +695,34 @@ def collect_x_mentions(limit=10, dry_run=True):
     Returns:
         list: Collected mentions
     """
+    global _x_mentions_reset_at
     if not x_client:
         logger.error("X client not initialized")
         return []
     
-    # Load processed IDs
-    processed_data = load_processed_ids(PROCESSED_X_IDS_FILE, {"ids": []})
-    processed_ids = set(processed_data["ids"])
+    if time.time() < _x_mentions_reset_at:
+        logger.info(f"X rate limit exhausted, skipping mentions until {datetime.fromtimestamp(_x_mentions_reset_at):%H:%M:%S}")
+        return []
+    
+    # Load the newest processed ID
+    last_id = load_last_processed_id(PROCESSED_X_IDS_FILE)
+    newest_id = last_id
     
     try:
-        # Get mentions timeline
-        mentions = x_client.mentions_timeline(count=limit)
+        # Get mentions newer than the last processed one
+        if last_id:
+            mentions = x_client.mentions_timeline(count=limit, since_id=last_id)
+        else:
+            mentions = x_client.mentions_timeline(count=limit)
+        
+        # Stop before the 429 when the response says the window is used up
+        headers = getattr(getattr(x_client, 'last_response', None), 'headers', None) or {}
+        if headers.get('x-rate-limit-remaining') == '0' and headers.get('x-rate-limit-reset'):
+            _x_mentions_reset_at = float(headers['x-rate-limit-reset'])
         
         collected = []
         for tweet in mentions:
-            # Skip already processed tweets
-            if str(tweet.id) in processed_ids:
-                continue
+            newest_id = max(newest_id or 0, tweet.id)
             
             collected.append({
                 "tweet_id": str(tweet.id),
@@ -457,20 +732,21 @@ def collect_x_mentions(limit=10, dry_run=True):
                 "timestamp": tweet.created_at.isoformat() if hasattr(tweet, "created_at") else datetime.now().isoformat()
             })
             
-            # Add to processed IDs
-            processed_ids.add(str(tweet.id))
-            
             if dry_run:
-                logger.info(f"DRY-RUN: Collected from X: {tweet.text[:100]}{'...' if len(tweet.text) > 100 else ''}")
+                logger.info("DRY-RUN: Collected from X: %.100s%s", tweet.text, '...' if len(tweet.text) > 100 else '')
         
-        # Update processed IDs file
-        processed_data["ids"] = list(processed_ids)
-        save_processed_ids(processed_data, PROCESSED_X_IDS_FILE)
+        # Advance the high-water mark past everything seen this run
+        if newest_id != last_id:
+            save_last_processed_id(newest_id, PROCESSED_X_IDS_FILE)
         
         logger.info(f"Collected {len(collected)} new X mentions")
         return collected
     except Exception as e:
         logger.error(f"Error collecting X mentions: {e}")
+        response = get_rate_limit_response(e)
+        if response is not None:
+            reset = (getattr(response, 'headers', None) or {}).get('x-rate-limit-reset')
+            _x_mentions_reset_at = float(reset) if reset else time.time() + X_RATE_LIMIT_WINDOW
         if "403 Forbidden" in str(e) and "different access level" in str(e):
             logger.warning("X API access level insufficient - requires Elevated access for mentions_timeline")
         
@@ -487,77 +763,158 @@ def collect_x_mentions(limit=10, dry_run=True):
                 } for i in range(1, 4)
             ]
             for tweet in simulated_mentions:
-                logger.info(f"DRY-RUN: Collected from X: {tweet['content']}")
+                logger.info("DRY-RUN: Collected from X: %s", tweet['content'])
             return simulated_mentions
         return []
 
-def analyze_and_store_sentiment(messages, platform, dry_run=True):
+_sentiment_pipeline = None
+_sentiment_pipeline_lock = threading.Lock()
+
+# (label, score) for recently classified texts, keyed by a hash of the text, so repeated
+# content (retweets, pasted messages) skips the model; kept across restarts on disk
+SENTIMENT_CACHE_SIZE = 10000
+SENTIMENT_CACHE_FILE = os.path.expanduser("~/.cache/pulsecheck_sentiment.json")
+_sentiment_cache = None
+
+def get_sentiment_pipeline():
+    """Return the sentiment pipeline, loading it on first use
+    
+    FP16 on the GPU when there is one, otherwise the INT8 ONNX Runtime export
+    shared with analyze_sentiment.py. Loading takes seconds, so live collection
+    reuses one instance across cycles.
+    """
+    global _sentiment_pipeline
+    if _sentiment_pipeline is None:
+        with _sentiment_pipeline_lock:
+            if _sentiment_pipeline is None:
+                import torch
+                from transformers import AutoTokenizer, pipeline
+                if torch.cuda.is_available():
+                    _sentiment_pipeline = pipeline("sentiment-analysis", model=MODEL_NAME,
+                                                   device=0, model_kwargs={"torch_dtype": torch.float16})
+                else:
+                    try:
+                        _sentiment_pipeline = pipeline("sentiment-analysis", model=load_quantized_model(),
+                                                       tokenizer=AutoTokenizer.from_pretrained(ONNX_MODEL_DIR))
+                    except ImportError:
+                        logger.warning("optimum[onnxruntime] not installed, using the FP32 sentiment model")
+                        _sentiment_pipeline = pipeline("sentiment-analysis", model=MODEL_NAME)
+    return _sentiment_pipeline
+
+def sentiment_cache_key(text):
+    """Return the sentiment cache key for a message text"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+def get_sentiment_cache():
+    """Return the LRU sentiment cache, loading it from disk on first use"""
+    global _sentiment_cache
+    if _sentiment_cache is None:
+        _sentiment_cache = OrderedDict()
+        try:
+            with open(SENTIMENT_CACHE_FILE, 'r') as f:
+                _sentiment_cache.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        atexit.register(save_sentiment_cache)
+    return _sentiment_cache
+
+def save_sentiment_cache():
+    """Persist the sentiment cache, oldest entries first"""
+    try:
+        os.makedirs(os.path.dirname(SENTIMENT_CACHE_FILE), exist_ok=True)
+        with open(SENTIMENT_CACHE_FILE, 'w') as f:
+            json.dump(_sentiment_cache, f)
+    except Exception as e:
+        logger.warning(f"Could not save sentiment cache: {e}")
+
+def store_collected(cursor, message_rows, sentiment_rows):
+    """Write collected messages and their sentiment in a few statements
+    
+    Rows are COPYed into temp staging tables and merged with one INSERT ... SELECT
+    each, so conflicts are still resolved the way the per-row INSERTs did.
+    """
+    if message_rows:
+        copy_merge(cursor, "discord_messages", COLLECTED_MESSAGE_COLUMNS, message_rows,
+                   conflict=("message_id",))
+    if sentiment_rows:
+        copy_merge(cursor, "sentiment_analysis", COLLECTED_SENTIMENT_COLUMNS, sentiment_rows,
+                   conflict=("message_id", "platform"),
+                   update=("sentiment", "confidence", "topics", "metadata"))
+
+def analyze_and_store_sentiment(batches, dry_run=True):
     """Analyze sentiment of messages and store in database
     
+    Messages from every platform share one pipeline call and one transaction.
+    
     Args:
-        messages (list): List of message dictionaries
-        platform (str): Platform identifier (discord, x)
+        batches (dict): Lists of message dictionaries keyed by platform identifier (discord, x)
         dry_run (bool): If True, just log without storing
         
     Returns:
-        int: Number of messages analyzed
+        Counter: Number of messages analyzed per platform
     """
-    if not messages:
-        return 0
+    analyzed = Counter()
+    items = [(platform, msg) for platform, messages in batches.items()
+             for msg in messages if msg.get("content", "")]
+    if not items:
+        return analyzed
     
-    # Import HF transformer for sentiment analysis
-    try:
-        from transformers import pipeline
-    except ImportError:
-        logger.error("Failed to import transformers. Try: pip install transformers")
-        return 0
+    cache = get_sentiment_cache()
+    keys = [sentiment_cache_key(msg["content"]) for _, msg in items]
+    misses = {key: msg["content"] for key, (_, msg) in zip(keys, items) if key not in cache}
+    
+    # Load (or reuse) the sentiment model, unless every text is already cached
+    if misses:
+        try:
+            sentiment_analyzer = get_sentiment_pipeline()
+        except ImportError:
+            logger.error("Failed to import transformers. Try: pip install transformers")
+            return analyzed
+        except Exception as e:
+            logger.error(f"Error loading sentiment analysis model: {e}")
+            return analyzed
     
     try:
-        # Load sentiment analysis model
-        sentiment_analyzer = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
-        
         conn = get_db_connection()
         if not conn:
             logger.error("Database connection failed")
-            return 0
+            return analyzed
         
         cursor = conn.cursor()
-        analyzed_count = 0
+        message_rows = []
+        sentiment_rows = []
         
         # Ensure metadata column exists
         ensure_metadata_column_exists()
         
-        for msg in messages:
-            content = msg.get("content", "")
-            if not content:
-                continue
+        # Classify every text the cache hasn't seen in one batched pipeline call;
+        # truncation keeps long messages inside the model's 512 token limit
+        if misses:
+            results = sentiment_analyzer(list(misses.values()),
+                                         batch_size=SENTIMENT_BATCH_SIZE, truncation=True)
+            for key, sentiment in zip(misses, results):
+                cache[key] = (sentiment["label"], sentiment["score"])
+        sentiments = []
+        for key in keys:
+            cache.move_to_end(key)
+            sentiments.append(cache[key])
+        while len(cache) > SENTIMENT_CACHE_SIZE:
+            cache.popitem(last=False)
+        
+        for (platform, msg), (sentiment_label, confidence) in zip(items, sentiments):
+            content = msg["content"]
             
-            # Analyze sentiment
             try:
-                # Limit input size to avoid model errors
-                truncated_content = content[:512]
-                result = sentiment_analyzer(truncated_content)
-                sentiment = result[0]
-                
-                # Extract values
-                sentiment_label = sentiment["label"]
-                confidence = sentiment["score"]
-                
                 # Extract topics
                 topics = extract_topics(content)
                 
                 if dry_run:
-                    logger.info(f"DRY-RUN: Collected from {platform.capitalize()}: '{content[:100]}{'...' if len(content) > 100 else ''}' (Sentiment: {sentiment_label}, Score: {confidence:.2f}, Topics: {topics})")
+                    logger.info("DRY-RUN: Collected from %s: '%.100s%s' (Sentiment: %s, Score: %.2f, Topics: %s)",
+                                platform.capitalize(), content, '...' if len(content) > 100 else '', sentiment_label, confidence, topics)
                 
-                # Store in database based on platform
+                # Queue rows for the bulk write below based on platform
                 if platform == "discord":
-                    # First insert into discord_messages if not exists
-                    cursor.execute("""
-                        INSERT INTO discord_messages 
-                        (message_id, content, user_id, timestamp, channel_id, guild_id)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (message_id) DO NOTHING
-                    """, (
+                    message_rows.append((
                         msg["message_id"],
                         content,
                         msg["user_id"],
@@ -565,18 +922,7 @@ def analyze_and_store_sentiment(messages, platform, dry_run=True):
                         msg.get("channel_id", ""),
                         msg.get("guild_id", "")
                     ))
-                    
-                    # Then insert sentiment analysis
-                    cursor.execute("""
-                        INSERT INTO sentiment_analysis
-                        (message_id, platform, sentiment, confidence, topics, metadata)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (message_id, platform) DO UPDATE
-                        SET sentiment = EXCLUDED.sentiment,
-                            confidence = EXCLUDED.confidence,
-                            topics = EXCLUDED.topics,
-                            metadata = EXCLUDED.metadata
-                    """, (
+                    sentiment_rows.append((
                         msg["message_id"],
                         platform,
                         sentiment_label,
@@ -594,16 +940,7 @@ def analyze_and_store_sentiment(messages, platform, dry_run=True):
                 elif platform == "x":
                     # For X, we store it differently since there's no dedicated table
                     # We'll use a JSON field to store the metadata
-                    cursor.execute("""
-                        INSERT INTO sentiment_analysis
-                        (message_id, platform, sentiment, confidence, topics, metadata)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (message_id, platform) DO UPDATE
-                        SET sentiment = EXCLUDED.sentiment,
-                            confidence = EXCLUDED.confidence,
-                            topics = EXCLUDED.topics,
-                            metadata = EXCLUDED.metadata
-                    """, (
+                    sentiment_rows.append((
                         msg["tweet_id"],
                         platform,
                         sentiment_label,
@@ -617,41 +954,126 @@ def analyze_and_store_sentiment(messages, platform, dry_run=True):
                         })
                     ))
                 
-                analyzed_count += 1
-                logger.info(f"Analyzed {platform} message: {sentiment_label} ({confidence:.2f})")
+                analyzed[platform] += 1
+                logger.info("Analyzed %s message: %s (%.2f)", platform, sentiment_label, confidence)
             
             except Exception as e:
                 logger.error(f"Error analyzing {platform} message {msg.get('message_id', 'unknown')}: {e}")
                 continue
         
+        summary = ', '.join(f"{count} {platform}" for platform, count in analyzed.items())
         if not dry_run:
+            store_collected(cursor, message_rows, sentiment_rows)
             conn.commit()
-            logger.info(f"Stored sentiment for {analyzed_count} {platform} messages")
+            logger.info(f"Stored sentiment for {summary} messages")
         else:
-            logger.info(f"DRY-RUN: Would analyze {analyzed_count} {platform} messages")
+            logger.info(f"DRY-RUN: Would analyze {summary} messages")
         
-        return analyzed_count
+        return analyzed
     
     except Exception as e:
         logger.error(f"Error in sentiment analysis and storage: {e}")
         if conn:
             conn.rollback()
-        return 0
+        return Counter()
     finally:
         if conn:
             cursor.close()
-            conn.close()
+            release_db_connection(conn)
+
+class TokenBucket:
+    """Async token bucket allowing `rate` acquisitions per second in bursts of up to `capacity`"""
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = None
+    
+    async def acquire(self):
+        # Created lazily so the lock belongs to the loop that is actually running
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+# Write budgets: Bluesky allows 5000 points/hour at 3 points per post, and X
+# allows 300 posts per 3 hours
+POST_RATE_LIMITS = {
+    "X": TokenBucket(rate=300 / (3 * 3600), capacity=10),
+    "Bluesky": TokenBucket(rate=5000 / 3 / 3600, capacity=10),
+}
+
+def get_rate_limit_response(error):
+    """Return the HTTP response behind a tweepy/atproto 429 error, or None"""
+    response = getattr(error, 'response', None)
+    if response is None and error.args:
+        response = error.args[0]
+    if getattr(response, 'status_code', None) == 429:
+        return response
+    return None
 
-def post_sentiment_summary(platform_limit=5, dry_run=False, target_platforms=None):
+def retry_delay(response, attempt):
+    """Seconds to wait before retrying: until the advertised reset, else exponential backoff"""
+    headers = getattr(response, 'headers', None) or {}
+    reset = headers.get('ratelimit-reset') or headers.get('x-rate-limit-reset')
+    if reset:
+        return max(0.0, float(reset) - time.time())
+    return 2 ** attempt + random.random()
+
+async def send_post(name, message, semaphore):
+    """Send one message to X or Bluesky without blocking the event loop
+    
+    The tweepy and atproto clients are synchronous, so each call runs in a worker
+    thread and the semaphore caps how many are in flight per host. Sends draw from
+    the platform's token bucket, and 429 responses are retried with exponential
+    backoff, or after the reset time the server reports when it sends one.
+    
+    Returns:
+        bool: True if the post was sent
+    """
+    async with semaphore:
+        for attempt in range(1, MAX_POST_ATTEMPTS + 1):
+            await POST_RATE_LIMITS[name].acquire()
+            try:
+                if name == "X":
+                    await asyncio.to_thread(x_client.update_status, status=message)
+                else:
+                    await asyncio.to_thread(bsky_client.send_post, text=message)
+                logger.info("Posted to %s: %s", name, message)
+                return True
+            except Exception as e:
+                response = get_rate_limit_response(e)
+                if response is None or attempt == MAX_POST_ATTEMPTS:
+                    logger.error(f"Error posting to {name}: {e}")
+                    return False
+                delay = retry_delay(response, attempt)
+                logger.warning(f"Rate limited by {name}, retrying in {delay:.0f}s (attempt {attempt}/{MAX_POST_ATTEMPTS})")
+                await asyncio.sleep(delay)
+
+async def post_sentiment_summary(platform_limit=5, dry_run=False, target_platforms=None, platforms=None, now=None):
     """Post positive sentiment insights to social media platforms
     
     Args:
         platform_limit (int): Maximum number of posts per platform
         dry_run (bool): If True, log posts without sending them
         target_platforms (list): List of platforms to post to ('x', 'bluesky', or both)
+        platforms (dict): Result of a previous authenticate_platforms call to reuse
+        now (datetime): Reference time for the look-back windows (default: datetime.now())
     """
+    if now is None:
+        now = datetime.now()
     # Authenticate with platforms
-    platforms = authenticate_platforms(target_platforms, dry_run)
+    if platforms is None:
+        platforms = authenticate_platforms(target_platforms, dry_run)
     
     active_platforms = [p for p, available in platforms.items() if available]
     if not active_platforms:
@@ -665,128 +1087,95 @@ def post_sentiment_summary(platform_limit=5, dry_run=False, target_platforms=Non
         logger.error("Database connection failed. Exiting.")
         return False
     
+    cursor = None
+    backfill = None
     try:
-        # Ensure topics column exists
+        # Ensure topics column and posted_log table exist
         ensure_topics_column_exists()
+        ensure_posted_log_exists()
         
-        # First update topics for messages without topics
+        # Update topics for messages without topics on its own pooled connection
+        # while this run queries and posts; rows it hasn't reached yet get their
+        # topics extracted inline below
         logger.info("Checking and updating topics for messages")
-        update_topics_in_database()
+        backfill = asyncio.create_task(asyncio.to_thread(update_topics_in_database))
         
         cursor = conn.cursor()
         # Use a much wider time window (30 days) to find more posts
-        discord_time_window = datetime.now() - timedelta(days=30)
-        bluesky_time_window = datetime.now() - timedelta(days=7)
+        discord_time_window = now - timedelta(days=30)
+        bluesky_time_window = now - timedelta(days=7)
         
-        # First query for Discord posts
-        if not target_platforms or 'x' in target_platforms:
-            cursor.execute("""
-                SELECT sa.message_id, sa.platform, sa.sentiment, sa.confidence, dm.content, dm.timestamp, sa.topics
-                FROM sentiment_analysis sa
-                JOIN discord_messages dm ON sa.message_id = dm.message_id
-                WHERE sa.platform = 'discord' AND sa.sentiment = 'POSITIVE' AND sa.confidence > 0.8 
-                  AND dm.timestamp > %s
-                ORDER BY dm.timestamp DESC
-                LIMIT %s
-            """, (discord_time_window, platform_limit))
-            
-            discord_posts = cursor.fetchall()
-            logger.info(f"Found {len(discord_posts)} Discord posts with positive sentiment")
-        else:
-            discord_posts = []
-            
-        # Then query for Bluesky posts
-        if not target_platforms or 'bluesky' in target_platforms:
-            cursor.execute("""
-                SELECT sa.message_id, sa.platform, sa.sentiment, sa.confidence, bp.content, bp.timestamp, sa.topics
-                FROM sentiment_analysis sa
-                JOIN bluesky_posts bp ON sa.message_id = bp.post_id
-                WHERE sa.platform = 'bluesky' AND sa.sentiment = 'POSITIVE' AND sa.confidence > 0.8 
-                  AND bp.timestamp > %s
-                ORDER BY bp.timestamp DESC
-                LIMIT %s
-            """, (bluesky_time_window, platform_limit))
-            
-            bluesky_posts = cursor.fetchall()
-            logger.info(f"Found {len(bluesky_posts)} Bluesky posts with positive sentiment")
-        else:
-            bluesky_posts = []
-            
-        # Process Discord posts
-        x_count = 0
-        for msg_id, platform, sentiment, confidence, content, timestamp, topics in discord_posts:
-            if not content:
-                continue
-            
-            # Get topics if not already present
-            if not topics:
-                topics = extract_topics(content)
-                # Update database with topics
-                cursor.execute("""
-                    UPDATE sentiment_analysis 
-                    SET topics = %s 
-                    WHERE message_id = %s AND platform = %s
-                """, (topics, msg_id, platform))
-                conn.commit()
-                
-            snippet = content[:50] + '...' if len(content) > 50 else content
-            topic_text = f"about {topics}" if topics else ""
-            message = f"PulseCheck Alert: {platform.capitalize()} buzzing {topic_text}: '{snippet}' (Score: {confidence:.2f})"
+        # A deselected platform gets LIMIT 0 so the prepared plan stays the same
+        discord_limit = platform_limit if not target_platforms or 'x' in target_platforms else 0
+        bluesky_limit = platform_limit if not target_platforms or 'bluesky' in target_platforms else 0
+        prepare_summary_query(cursor)
+        cursor.execute("EXECUTE pulsecheck_summary (%s, %s, %s, %s)",
+                       (discord_time_window, discord_limit, bluesky_time_window, bluesky_limit))
+        rows = cursor.fetchall()
+        found = Counter(row[1] for row in rows)
+        logger.info(f"Found {found['discord']} Discord posts with positive sentiment")
+        logger.info(f"Found {found['bluesky']} Bluesky posts with positive sentiment")
             
-            if platforms["x"]:
-                if dry_run:
-                    logger.info(f"DRY-RUN: Would post to X: {message}")
-                    logger.info(f"DRY-RUN: Full content: {content}")
-                else:
-                    try:
-                        x_client.update_status(status=message)
-                        logger.info(f"Posted to X: {message}")
-                    except Exception as e:
-                        logger.error(f"Error posting to X: {e}")
-                x_count += 1
-            
-        # Process Bluesky posts
-        bsky_count = 0
-        for msg_id, platform, sentiment, confidence, content, timestamp, topics in bluesky_posts:
-            if not content:
-                continue
-                
+        # Build every message first, then send them all concurrently
+        sends = []
+        topic_updates = []
+        post_counts = Counter()
+        for msg_id, platform, sentiment, confidence, content, timestamp, topics, snippet in rows:
             # Get topics if not already present
             if not topics:
                 topics = extract_topics(content)
-                # Update database with topics
-                cursor.execute("""
-                    UPDATE sentiment_analysis 
-                    SET topics = %s 
-                    WHERE message_id = %s AND platform = %s
-                """, (topics, msg_id, platform))
-                conn.commit()
+                topic_updates.append((msg_id, platform, topics))
                 
-            snippet = content[:50] + '...' if len(content) > 50 else content
             topic_text = f"about {topics}" if topics else ""
             message = f"PulseCheck Alert: {platform.capitalize()} buzzing {topic_text}: '{snippet}' (Score: {confidence:.2f})"
             
-            if platforms["bluesky"]:
+            target, name = POST_TARGETS[platform]
+            if platforms[target]:
                 if dry_run:
-                    logger.info(f"DRY-RUN: Would post to Bluesky: {message}")
-                    logger.info(f"DRY-RUN: Full content: {content}")
+                    logger.info("DRY-RUN: Would post to %s: %s", name, message)
+                    if content:
+                        logger.info("DRY-RUN: Full content: %s", content)
                 else:
-                    try:
-                        bsky_client.send_post(text=message)
-                        logger.info(f"Posted to Bluesky: {message}")
-                    except Exception as e:
-                        logger.error(f"Error posting to Bluesky: {e}")
-                bsky_count += 1
+                    sends.append((name, message, msg_id, platform))
+                post_counts[target] += 1
+        
+        posted = []
+        if sends:
+            semaphores = {"X": asyncio.Semaphore(POST_CONCURRENCY), "Bluesky": asyncio.Semaphore(POST_CONCURRENCY)}
+            results = await asyncio.gather(*(send_post(name, message, semaphores[name]) for name, message, _, _ in sends))
+            posted = [(msg_id, platform, name) for (name, _, msg_id, platform), ok in zip(sends, results) if ok]
         
-        logger.info(f"Run complete: {x_count} X posts, {bsky_count} Bluesky posts {'(dry run)' if dry_run else ''}")
+        # Let the backfill finish first so the two never update the same rows at once
+        await backfill
+        
+        # All bookkeeping goes out in two statements and one commit, however many posts there were
+        if topic_updates:
+            execute_values(cursor, """
+                UPDATE sentiment_analysis AS sa
+                SET topics = v.topics
+                FROM (VALUES %s) AS v(message_id, platform, topics)
+                WHERE sa.message_id = v.message_id AND sa.platform = v.platform
+            """, topic_updates, page_size=200)
+        if posted:
+            execute_values(cursor, """
+                INSERT INTO posted_log (message_id, platform, posted_to) VALUES %s
+            """, posted, page_size=200)
+        conn.commit()
+        logger.info(f"Run complete: {post_counts['x']} X posts, {post_counts['bluesky']} Bluesky posts {'(dry run)' if dry_run else ''}")
         
     except Exception as e:
         logger.error(f"Error processing sentiment data: {e}")
+        if not conn.closed:
+            conn.rollback()
         return False
     finally:
-        if conn:
+        # The pool hands the most recently returned connection out first, so the
+        # prepared query is normally still there on the next daemon run
+        if cursor:
             cursor.close()
-            conn.close()
+        release_db_connection(conn)
+        if backfill:
+            await backfill
     
     return True
 
@@ -807,10 +1196,20 @@ async def run_live_collection(dry_run=True, duration_minutes=30, discord_channel
         logger.error("No platforms available for collection. Exiting.")
         return False
     
+    # Load the sentiment model while the first cycle is still waiting on the network
+    warmup = asyncio.create_task(asyncio.to_thread(get_sentiment_pipeline))
+    
     logger.info(f"Starting live collection for {duration_minutes} minutes (dry_run={dry_run}, interval={interval_minutes} minutes, simulate={simulate})")
     
-    start_time = datetime.now()
-    end_time = start_time + timedelta(minutes=duration_minutes)
+    # Monotonic, so a wall-clock jump (NTP step, DST) can't end the run early or late
+    deadline = time.monotonic() + duration_minutes * 60
+    
+    # Run new tasks up to their first real await right away instead of on the next tick;
+    # the caller's factory is put back in the finally below
+    loop = asyncio.get_running_loop()
+    previous_task_factory = loop.get_task_factory()
+    if sys.version_info >= (3, 12):
+        loop.set_task_factory(asyncio.eager_task_factory)
     
     # Set up Discord client event
     if platforms["discord"] and discord_channel_id:
@@ -831,56 +1230,125 @@ async def run_live_collection(dry_run=True, duration_minutes=30, discord_channel
     else:
         discord_task = None
     
+    # SIGINT/SIGTERM end the wait between cycles instead of sitting out the interval
+    stop_event = asyncio.Event()
+    handled_signals = []
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+            handled_signals.append(sig)
+        except (NotImplementedError, RuntimeError):
+            # No loop signal handlers on Windows or outside the main thread
+            pass
+    
+    # The first couple of cycles come quickly so a new run shows results early, then settle to the interval
+    sleep_schedule = itertools.chain([60] * 2, itertools.repeat(60 * interval_minutes))
+    stop_task = asyncio.create_task(stop_event.wait())
+    
     try:
         iteration = 0
-        while datetime.now() < end_time:
+        while time.monotonic() < deadline and not stop_event.is_set():
             iteration += 1
-            logger.info(f"Collection iteration {iteration} started")
+            logger.info("Collection iteration %d started", iteration)
             
-            # Collect from X (every interval_minutes, Twitter rate limits)
-            x_count = 0
+            # Collect from X (every interval_minutes, Twitter rate limits) and Discord
+            # concurrently; tweepy is synchronous, so X runs in a worker thread
+            collectors = {}
             if platforms["x"]:
                 logger.info("Collecting from X mentions...")
-                x_mentions = collect_x_mentions(limit=10, dry_run=dry_run)
-                if x_mentions:
-                    x_count = analyze_and_store_sentiment(x_mentions, "x", dry_run=dry_run)
-            
-            # Collect from Discord
-            discord_count = 0
+                collectors["x"] = asyncio.to_thread(collect_x_mentions, limit=10, dry_run=dry_run)
             if platforms["discord"] and discord_channel_id:
-                logger.info(f"Collecting from Discord channel {discord_channel_id}...")
-                discord_messages = await collect_discord_messages(discord_channel_id, limit=10, dry_run=dry_run, simulate=simulate)
-                if discord_messages:
-                    discord_count = analyze_and_store_sentiment(discord_messages, "discord", dry_run=dry_run)
+                logger.info("Collecting from Discord channel %s...", discord_channel_id)
+                collectors["discord"] = collect_discord_messages(discord_channel_id, limit=10, dry_run=dry_run, simulate=simulate)
+            results = await asyncio.gather(*collectors.values(), return_exceptions=True)
+            
+            batches = {}
+            for platform, collected in zip(collectors, results):
+                if isinstance(collected, Exception):
+                    logger.error("Error collecting from %s: %s", platform, collected)
+                elif collected:
+                    batches[platform] = collected
+            
+            # One inference pass over both platforms' messages. It is CPU/GPU-bound, so run
+            # it off the event loop to keep the Discord gateway heartbeat going
+            if warmup is not None:
+                # A load failure is raised (and logged) again by analyze_and_store_sentiment
+                with contextlib.suppress(Exception):
+                    await warmup
+                warmup = None
+            counts = await asyncio.to_thread(analyze_and_store_sentiment, batches, dry_run=dry_run)
             
             # Log cycle summary
-            logger.info(f"Cycle {iteration}: Collected {x_count} X mentions, {discord_count} Discord messages")
+            logger.info("Cycle %d: Collected %d X mentions, %d Discord messages", iteration, counts['x'], counts['discord'])
             
             # Calculate time remaining and sleep appropriately
-            now = datetime.now()
-            if now >= end_time:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
                 break
                 
-            remaining = (end_time - now).total_seconds()
-            # For testing purposes, use shorter sleep intervals
-            sleep_time = min(60 * 1 if iteration < 3 else 60 * interval_minutes, remaining)  # First few iterations quicker
+            sleep_time = min(next(sleep_schedule), remaining)
             
-            logger.info(f"Waiting {sleep_time:.1f} seconds before next collection...")
-            await asyncio.sleep(sleep_time)
+            logger.info("Waiting %.1f seconds before next collection...", sleep_time)
+            # Wake early on a stop signal, or as soon as the Discord client dies
+            wake_at = time.monotonic() + sleep_time
+            waiters = {stop_task, discord_task} if discord_task else {stop_task}
+            done, _ = await asyncio.wait(waiters, timeout=sleep_time, return_when=asyncio.FIRST_COMPLETED)
+            if discord_task in done:
+                error = None if discord_task.cancelled() else discord_task.exception()
+                logger.error("Discord client stopped (%s), continuing without Discord", error or 'connection closed')
+                discord_task = None
+                platforms["discord"] = False
+                done, _ = await asyncio.wait({stop_task}, timeout=max(0, wake_at - time.monotonic()))
+            if stop_task in done:
+                logger.info("Stop requested, ending live collection")
     
     except KeyboardInterrupt:
         logger.info("Live collection interrupted by user")
     except Exception as e:
         logger.error(f"Error in live collection: {e}")
     finally:
-        # Clean up Discord client
+        for sig in handled_signals:
+            loop.remove_signal_handler(sig)
+        stop_task.cancel()
+        if warmup is not None:
+            warmup.cancel()
+        
+        # Clean up Discord client: close() logs out and shuts the gateway socket so start()
+        # returns on its own; wait_for cancels it if that takes too long
         if discord_task and not discord_task.done():
-            discord_task.cancel()
+            with contextlib.suppress(Exception, asyncio.CancelledError):
+                await asyncio.wait_for(discord_client.close(), timeout=5.0)
+            with contextlib.suppress(Exception, asyncio.CancelledError):
+                await asyncio.wait_for(discord_task, timeout=5.0)
+        loop.set_task_factory(previous_task_factory)
         
         logger.info("Live collection completed")
     
     return True
 
+async def run_daemon(platform_limit=5, dry_run=False, target_platforms=None, interval_minutes=60):
+    """Post sentiment summaries on a fixed interval from one long-lived process
+    
+    Authenticates once and reuses the clients for every run instead of paying a
+    login per scheduled invocation.
+    
+    Args:
+        platform_limit (int): Maximum number of posts per platform
+        dry_run (bool): If True, log posts without sending them
+        target_platforms (list): List of platforms to post to ('x', 'bluesky', or both)
+        interval_minutes (int): Minutes between posting runs
+    """
+    platforms = authenticate_platforms(target_platforms, dry_run)
+    while True:
+        await post_sentiment_summary(
+            platform_limit=platform_limit,
+            dry_run=dry_run,
+            target_platforms=target_platforms,
+            platforms=platforms
+        )
+        logger.info(f"Next posting run in {interval_minutes} minutes")
+        await asyncio.sleep(interval_minutes * 60)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='PulseCheck - Collect and post sentiment insights')
     parser.add_argument('--dry-run', action='store_true', help='Log actions without posting or storing')
@@ -898,6 +1366,10 @@ if __name__ == "__main__":
                         help='Minutes between collection cycles (default: 15)')
     parser.add_argument('--simulate', action='store_true',
                         help='Use simulated data instead of real connections')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Keep running and post a summary every --every minutes')
+    parser.add_argument('--every', type=int, default=60,
+                        help='Minutes between posting runs in daemon mode (default: 60)')
     args = parser.parse_args()
     
     # Convert platform argument to a list
@@ -906,6 +1378,13 @@ if __name__ == "__main__":
     else:
         target_platforms = [args.platform]
     
+    # uvloop is optional (and Unix-only); fall back to the stock event loop without it
+    try:
+        import uvloop
+        run_async = uvloop.run
+    except (ImportError, AttributeError):
+        run_async = asyncio.run
+    
     success = False
     if args.live:
         # Run in live collection mode
@@ -913,19 +1392,30 @@ if __name__ == "__main__":
             logger.error("Discord channel ID is required for live collection")
             sys.exit(1)
         
-        success = asyncio.run(run_live_collection(
+        success = run_async(run_live_collection(
             dry_run=args.dry_run,
             duration_minutes=args.duration,
             discord_channel_id=args.discord_channel,
             interval_minutes=args.interval,
             simulate=args.simulate
         ))
+    elif args.daemon:
+        try:
+            run_async(run_daemon(
+                platform_limit=args.count,
+                dry_run=args.dry_run,
+                target_platforms=target_platforms,
+                interval_minutes=args.every
+            ))
+        except KeyboardInterrupt:
+            logger.info("Daemon stopped by user")
+        success = True
     else:
         # Run in regular posting mode
-        success = post_sentiment_summary(
+        success = run_async(post_sentiment_summary(
             platform_limit=args.count, 
             dry_run=args.dry_run, 
             target_platforms=target_platforms
-        )
+        ))
         
     sys.exit(0 if success else 1) 
\ No newline at end of file
@@ -0,0 +1,84 @@
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from db import format_copy_value, staging_table_sql, merge_staged_sql, copy_merge
+
+
+class RecordingCursor:
+    """Stands in for a psycopg2 cursor and records what copy_merge sends"""
+
+    def __init__(self, rowcount=0):
+        self.statements = []
+        self.copies = []
+        self.rowcount = rowcount
+
+    def execute(self, sql):
+        self.statements.append(sql)
+
+    def copy_expert(self, sql, file):
+        self.copies.append((sql, file.read()))
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, "\\N"),
+    ("plain", "plain"),
+    ("back\\slash", "back\\\\slash"),
+    ("tab\there", "tab\\there"),
+    ("new\nline", "new\\nline"),
+    ("carriage\rreturn", "carriage\\rreturn"),
+    ("\\N", "\\\\N"),
+    (42, "42"),
+    ("", ""),
+])
+def test_format_copy_value(value, expected):
+    assert format_copy_value(value) == expected
+
+
+def test_staging_table_sql_copies_only_the_listed_columns():
+    sql = staging_table_sql("stg_discord", "discord_messages", ("message_id", "content"))
+    assert sql == ("CREATE TEMP TABLE stg_discord ON COMMIT DROP AS "
+                   "SELECT message_id, content FROM discord_messages WITH NO DATA")
+
+
+def test_staging_table_sql_reusable_stage():
+    sql = staging_table_sql("stg", "discord_messages", ("message_id",),
+                            on_commit="DELETE ROWS", if_not_exists=True)
+    assert sql.startswith("CREATE TEMP TABLE IF NOT EXISTS stg ON COMMIT DELETE ROWS AS ")
+
+
+def test_merge_staged_sql_do_nothing():
+    sql = merge_staged_sql("stg", "discord_messages", ("message_id", "content"), ("message_id",))
+    assert sql == ("INSERT INTO discord_messages (message_id, content) "
+                   "SELECT message_id, content FROM stg "
+                   "ON CONFLICT (message_id) DO NOTHING")
+
+
+def test_merge_staged_sql_do_update_keeps_one_row_per_key():
+    sql = merge_staged_sql("stg", "sentiment_analysis", ("message_id", "platform", "sentiment"),
+                           ("message_id", "platform"), update=("sentiment",))
+    assert sql == ("INSERT INTO sentiment_analysis (message_id, platform, sentiment) "
+                   "SELECT DISTINCT ON (message_id, platform) message_id, platform, sentiment FROM stg "
+                   "ORDER BY message_id, platform "
+                   "ON CONFLICT (message_id, platform) DO UPDATE SET sentiment = EXCLUDED.sentiment")
+
+
+def test_copy_merge_stages_copies_and_merges():
+    cursor = RecordingCursor(rowcount=2)
+    rows = [("1", "hello\tworld"), ("2", None)]
+    merged = copy_merge(cursor, "discord_messages", ("message_id", "content"), rows, ("message_id",))
+
+    assert merged == 2
+    assert cursor.statements == [
+        staging_table_sql("stg_discord_messages", "discord_messages", ("message_id", "content")),
+        merge_staged_sql("stg_discord_messages", "discord_messages", ("message_id", "content"), ("message_id",)),
+    ]
+    assert cursor.copies == [
+        ("COPY stg_discord_messages (message_id, content) FROM STDIN", "1\thello\\tworld\n2\t\\N\n"),
+    ]
+
+
+def test_copy_merge_with_no_rows_sends_an_empty_copy():
+    cursor = RecordingCursor()
+    assert copy_merge(cursor, "bluesky_posts", ("post_id",), [], ("post_id",)) == 0
+    assert cursor.copies == [("COPY stg_bluesky_posts (post_id) FROM STDIN", "")]
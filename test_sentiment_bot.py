@@ -0,0 +1,275 @@
+import json
+import string
+
+import pytest
+
+# Needs config.py and the bot's dependencies (tweepy, atproto, discord.py, nltk)
+sentiment_bot = pytest.importorskip("sentiment_bot")
+
+
+def test_missing_file_loads_none(tmp_path):
+    assert sentiment_bot.load_last_processed_id(str(tmp_path / "processed_x_ids.txt")) is None
+
+
+def test_save_writes_one_newline_terminated_id(tmp_path):
+    path = tmp_path / "processed_x_ids.txt"
+    sentiment_bot.save_last_processed_id(1234567890123456789, str(path))
+    assert path.read_text() == "1234567890123456789\n"
+    assert sentiment_bot.load_last_processed_id(str(path)) == 1234567890123456789
+
+
+def test_save_replaces_the_previous_id(tmp_path):
+    path = tmp_path / "processed_x_ids.txt"
+    sentiment_bot.save_last_processed_id(5, str(path))
+    sentiment_bot.save_last_processed_id(7, str(path))
+    assert path.read_text() == "7\n"
+
+
+def test_newline_log_loads_its_largest_id(tmp_path):
+    path = tmp_path / "processed_x_ids.txt"
+    path.write_text("100\n\n  \n9000\n250\n")
+    assert sentiment_bot.load_last_processed_id(str(path)) == 9000
+
+
+def test_corrupt_log_lines_are_skipped(tmp_path):
+    path = tmp_path / "processed_x_ids.txt"
+    path.write_text("garbage\n42\n-7\n1e9\n")
+    assert sentiment_bot.load_last_processed_id(str(path)) == 42
+
+
+def test_log_without_ids_loads_none(tmp_path):
+    path = tmp_path / "processed_x_ids.txt"
+    path.write_text("not an id\n")
+    assert sentiment_bot.load_last_processed_id(str(path)) is None
+
+
+def test_json_id_list_is_migrated(tmp_path):
+    (tmp_path / "processed_x_ids.json").write_text(json.dumps({"ids": ["12", 30, "abc", "7"]}))
+    assert sentiment_bot.load_last_processed_id(str(tmp_path / "processed_x_ids.txt")) == 30
+
+
+def test_newline_log_takes_precedence_over_json(tmp_path):
+    (tmp_path / "processed_x_ids.json").write_text(json.dumps({"ids": ["999"]}))
+    path = tmp_path / "processed_x_ids.txt"
+    path.write_text("5\n")
+    assert sentiment_bot.load_last_processed_id(str(path)) == 5
+
+
+@pytest.mark.parametrize("content", ["{not json", json.dumps({"other": []}), json.dumps({"ids": 5}), json.dumps([1, 2]), ""])
+def test_corrupt_json_loads_none(tmp_path, content):
+    (tmp_path / "processed_x_ids.json").write_text(content)
+    assert sentiment_bot.load_last_processed_id(str(tmp_path / "processed_x_ids.txt")) is None
+
+
+class FakeClock:
+    """Replaces time.monotonic and asyncio.sleep so TokenBucket waits take no real time"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(sentiment_bot.time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(sentiment_bot.asyncio, "sleep", fake.sleep)
+    return fake
+
+
+def test_token_bucket_bursts_up_to_capacity(clock):
+    bucket = sentiment_bot.TokenBucket(rate=2, capacity=3)
+
+    async def burst():
+        for _ in range(3):
+            await bucket.acquire()
+
+    sentiment_bot.asyncio.run(burst())
+    assert clock.sleeps == []
+
+
+def test_token_bucket_waits_for_the_next_token(clock):
+    bucket = sentiment_bot.TokenBucket(rate=2, capacity=1)
+
+    async def two():
+        await bucket.acquire()
+        await bucket.acquire()
+
+    sentiment_bot.asyncio.run(two())
+    assert clock.sleeps == [pytest.approx(0.5)]
+
+
+def test_token_bucket_refills_no_further_than_capacity(clock):
+    bucket = sentiment_bot.TokenBucket(rate=2, capacity=3)
+    bucket.tokens = 0
+    clock.now += 60
+    sentiment_bot.asyncio.run(bucket.acquire())
+    assert clock.sleeps == []
+    assert bucket.tokens == pytest.approx(2)
+
+
+class FakeResponse:
+    def __init__(self, status_code=429, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class ResponseError(Exception):
+    """Carries its response as an attribute, like tweepy.HTTPException"""
+
+    def __init__(self, response):
+        super().__init__("request failed")
+        self.response = response
+
+
+def test_rate_limit_response_from_attribute():
+    response = FakeResponse()
+    assert sentiment_bot.get_rate_limit_response(ResponseError(response)) is response
+
+
+def test_rate_limit_response_from_first_arg():
+    # atproto's RequestException wraps the response as its first argument
+    response = FakeResponse()
+    assert sentiment_bot.get_rate_limit_response(Exception(response)) is response
+
+
+@pytest.mark.parametrize("error", [ResponseError(FakeResponse(status_code=500)), Exception("boom"), Exception()])
+def test_other_errors_are_not_rate_limits(error):
+    assert sentiment_bot.get_rate_limit_response(error) is None
+
+
+@pytest.mark.parametrize("header", ["ratelimit-reset", "x-rate-limit-reset"])
+def test_retry_delay_waits_until_reset(monkeypatch, header):
+    monkeypatch.setattr(sentiment_bot.time, "time", lambda: 5000.0)
+    response = FakeResponse(headers={header: "5030"})
+    assert sentiment_bot.retry_delay(response, attempt=1) == pytest.approx(30)
+
+
+def test_retry_delay_past_reset_is_zero(monkeypatch):
+    monkeypatch.setattr(sentiment_bot.time, "time", lambda: 5000.0)
+    response = FakeResponse(headers={"ratelimit-reset": "4990"})
+    assert sentiment_bot.retry_delay(response, attempt=1) == 0
+
+
+@pytest.mark.parametrize("response", [FakeResponse(), FakeResponse(headers=None), None])
+def test_retry_delay_without_header_backs_off(monkeypatch, response):
+    monkeypatch.setattr(sentiment_bot.random, "random", lambda: 0.25)
+    assert sentiment_bot.retry_delay(response, attempt=3) == 8.25
+
+
+class FakeXClient:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def update_status(self, status):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+@pytest.fixture
+def x_client(monkeypatch, clock):
+    def install(errors):
+        client = FakeXClient(errors)
+        monkeypatch.setattr(sentiment_bot, "x_client", client)
+        # A fresh bucket so the module-level budget isn't drawn down between tests
+        monkeypatch.setitem(sentiment_bot.POST_RATE_LIMITS, "X", sentiment_bot.TokenBucket(rate=1, capacity=100))
+        return client
+    return install
+
+
+def send(message="hello"):
+    async def run():
+        return await sentiment_bot.send_post("X", message, sentiment_bot.asyncio.Semaphore(1))
+    return sentiment_bot.asyncio.run(run())
+
+
+def test_send_post_gives_up_after_max_attempts(x_client, clock):
+    limit = sentiment_bot.MAX_POST_ATTEMPTS
+    client = x_client([ResponseError(FakeResponse()) for _ in range(limit + 2)])
+    assert send() is False
+    assert client.calls == limit
+    assert len(clock.sleeps) == limit - 1
+
+
+def test_send_post_retries_a_rate_limit_then_succeeds(x_client, clock):
+    client = x_client([ResponseError(FakeResponse(headers={"x-rate-limit-reset": "0"}))])
+    assert send() is True
+    assert client.calls == 2
+    assert clock.sleeps == [0]
+
+
+def test_send_post_does_not_retry_other_errors(x_client, clock):
+    client = x_client([ValueError("bad request")])
+    assert send() is False
+    assert client.calls == 1
+    assert clock.sleeps == []
+
+
+# Covers every branch of extract_topics that TOPICS_PAGE_SQL has to reproduce
+TOPIC_TEXTS = [
+    None,
+    "",
+    "hey",
+    "abcd",
+    "https://example.com/only/a/link",
+    "Check https://t.co/abc123 python python tooling",
+    "apple banana cherry",
+    "banana apple apple banana cherry",
+    "Hello, world! hello... WORLD?? it's (really) great_stuff",
+    "don't won't can't shouldn't",
+    "this that with from have",
+    "tabs\tand\nnewlines  between\twords words",
+    "naïve café naïve über straße straße",
+    "🚀🚀 rocket 🚀🚀🚀🚀 launch 🚀🚀🚀🚀 rocket",
+    "2024 2024 release notes",
+    " ".join(["a" * 60, "b" * 60, "a" * 60, "c" * 60]),
+]
+
+
+@pytest.fixture
+def db_cursor():
+    conn = sentiment_bot.get_db_connection()
+    if conn is None:
+        pytest.skip("needs the PostgreSQL database configured in config.py")
+    cursor = conn.cursor()
+    try:
+        yield cursor
+    finally:
+        # Also drops the temp tables below
+        conn.rollback()
+        cursor.close()
+        sentiment_bot.release_db_connection(conn)
+
+
+def test_sql_topics_match_extract_topics(db_cursor):
+    assert sentiment_bot.ensure_topic_stopwords()
+    # Temp tables shadow the real sentiment_analysis for this session only
+    db_cursor.execute("""
+        CREATE TEMP TABLE sentiment_analysis (
+            id SERIAL PRIMARY KEY, message_id TEXT, platform TEXT, topics VARCHAR(100))
+    """)
+    db_cursor.execute("CREATE TEMP TABLE topic_test_messages (message_id TEXT, content TEXT)")
+    for i, text in enumerate(TOPIC_TEXTS):
+        db_cursor.execute("INSERT INTO topic_test_messages VALUES (%s, %s)", (str(i), text))
+        db_cursor.execute("INSERT INTO sentiment_analysis (message_id, platform) VALUES (%s, 'discord')", (str(i),))
+
+    db_cursor.execute(sentiment_bot.TOPICS_PAGE_SQL.format(table="topic_test_messages", key="message_id"), {
+        "platform": "discord",
+        "last_id": 0,
+        "page_size": len(TOPIC_TEXTS),
+        "punctuation": string.punctuation,
+    })
+    assert len(db_cursor.fetchall()) == len(TOPIC_TEXTS)
+
+    db_cursor.execute("SELECT message_id, topics FROM sentiment_analysis")
+    sql_topics = dict(db_cursor.fetchall())
+    assert sql_topics == {str(i): sentiment_bot.extract_topics(text) for i, text in enumerate(TOPIC_TEXTS)}
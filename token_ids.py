@@ -0,0 +1,51 @@
+import logging
+import os
+
+import numpy as np
+
+# Shared by the importer (which tokenizes as it loads) and the analyzer (which
+# reads the stored ids back), so both must agree on model and truncation
+MODEL_NAME = 'distilbert-base-uncased-finetuned-sst-2-english'
+MAX_LENGTH = 256
+# INT8 ONNX export of MODEL_NAME, exported once and reused on later runs
+ONNX_MODEL_DIR = 'onnx_sst2'
+QUANTIZED_FILE = 'model_quantized.onnx'
+
+logger = logging.getLogger(__name__)
+
+_tokenizer = None
+
+def get_tokenizer():
+    global _tokenizer
+    if _tokenizer is None:
+        from transformers import AutoTokenizer
+        _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    return _tokenizer
+
+def tokenize(texts):
+    """Return truncated input_ids (with special tokens) for each text"""
+    return get_tokenizer()(texts, truncation=True, max_length=MAX_LENGTH)["input_ids"]
+
+def pack_token_ids(ids):
+    return np.asarray(ids, dtype=np.int32).tobytes()
+
+def unpack_token_ids(data):
+    return np.frombuffer(data, dtype=np.int32)
+
+def load_quantized_model():
+    """Load the INT8 ONNX export of the model, exporting and quantizing it on first use"""
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    if not os.path.exists(os.path.join(ONNX_MODEL_DIR, QUANTIZED_FILE)):
+        logger.info(f"Exporting {MODEL_NAME} to ONNX and quantizing to INT8 in {ONNX_MODEL_DIR}")
+        ort_model = ORTModelForSequenceClassification.from_pretrained(MODEL_NAME, export=True)
+        ort_model.save_pretrained(ONNX_MODEL_DIR)
+        AutoTokenizer.from_pretrained(MODEL_NAME).save_pretrained(ONNX_MODEL_DIR)
+        quantizer = ORTQuantizer.from_pretrained(ort_model)
+        quantizer.quantize(
+            save_dir=ONNX_MODEL_DIR,
+            quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        )
+    return ORTModelForSequenceClassification.from_pretrained(ONNX_MODEL_DIR, file_name=QUANTIZED_FILE)